@@ -1,14 +1,32 @@
 import dash
-from dash import dcc, html, Input, Output, dash_table, ctx, exceptions
+import flask
+from dash import dcc, html, Input, Output, State, dash_table, ctx, exceptions
+import numpy as np
 import pandas as pd
 import requests
-import io
 import plotly.express as px
+import plotly.graph_objects as go
 import logging
+import re
+import time
+import uuid
+
+import cache
+import compression
+import config
+import export
+import fastjson
+import log_utils
+import metrics
+import price_stats
+from log_utils import log_stage, measure_stage, timed_stage
 
 logging.basicConfig(level=logging.INFO)
 
 app = dash.Dash(__name__)
+# Compresión de las respuestas del servidor (tablas y figuras de los callbacks, exportaciones CSV/NDJSON);
+# se registra primero para que sea el último after_request en ejecutarse
+compression.install_flask(app.server)
 
 # Título que aparecerá en la pestaña del navegador
 app.title = "Scraping MELI - Francisco"
@@ -34,6 +52,9 @@ app.meta_tags = [
 app.layout = html.Div([
     html.Div(className="loading-line", id="loading-line"),
 
+    # Id de la búsqueda actual; los resultados quedan en la caché del servidor (search_results)
+    dcc.Store(id="search-store"),
+
     html.H1("Scraping MELI - Francisco", style={'textAlign': 'center', 'color': '#ffffff'}),
 
     html.Div([
@@ -58,9 +79,72 @@ app.layout = html.Div([
         html.H2("Resultados de la Búsqueda",
                 style={'textAlign': 'center', 'color': '#ffffff', 'fontFamily': 'Roboto, sans-serif',
                        'fontSize': '28px'}),
-        html.Div(id="output-table", style={'margin-top': '20px', 'padding': '20px'}),
-        html.Button("Exportar a Excel", id="export-button", n_clicks=0, className="export-button"),
-        dcc.Download(id="download-link")
+        html.Div(id="output-table", style={'margin-top': '20px', 'padding': '20px'}, children=[
+            # Tabla de datos de productos con categoría
+            dash_table.DataTable(
+                id="products-table",
+                data=[],
+                columns=[
+                    {"name": "Imagen", "id": "Imagen", "presentation": "markdown"},
+                    {"name": "Artículo", "id": "Artículo"},
+                    {"name": "Categoría", "id": "Categoría"},  # Nueva columna de categoría
+                    {"name": "Marca", "id": "Marca"},
+                    {"name": "Modelo", "id": "Modelo"},
+                    {"name": "Condición", "id": "Condición"},
+                    {"name": "SKU", "id": "SKU"},
+                    {"name": "Precio", "id": "Precio"},
+                    {"name": "Stock Disponible", "id": "Stock Disponible"},
+                    {"name": "Cantidad Vendida", "id": "Cantidad Vendida"},
+                    {"name": "Envío Gratis", "id": "Envío Gratis", "presentation": "markdown"},
+                    {"name": "FULL", "id": "FULL", "presentation": "markdown"},
+                    {"name": "Vendedor", "id": "Vendedor"},
+                    {"name": "Tipo de Publicación", "id": "Tipo de Publicación"},
+                    {"name": "Publicación en Catálogo", "id": "Publicación en Catálogo"},
+                    {"name": "Url", "id": "Ver en MercadoLibre", "presentation": "markdown"},
+                ],
+                style_cell={
+                    'padding': '5px',
+                    'whiteSpace': 'normal',
+                    'height': 'auto',
+                    'textAlign': 'left',
+                    'fontFamily': 'Roboto, sans-serif',
+                    'backgroundColor': '#1e1e1e',
+                    'color': '#ffffff',
+                    'maxWidth': '150px',
+                    'overflow': 'hidden',
+                    'textOverflow': 'ellipsis',
+                },
+                style_header={
+                    'backgroundColor': '#444',
+                    'color': 'white',
+                    'fontWeight': 'bold',
+                    'textAlign': 'center'
+                },
+                style_table={'overflowX': 'auto', 'minWidth': '100%', 'maxWidth': '100%'},
+                markdown_options={'link_target': '_blank'},
+                row_deletable=False,
+                editable=False,
+                # Paginado, orden y filtros se resuelven en el servidor sobre la búsqueda guardada (update_products_page)
+                page_action="custom",
+                page_current=0,
+                sort_action="custom",
+                sort_mode="multi",
+                sort_by=[],
+                filter_action="custom",
+                filter_query="",
+                row_selectable="multi",
+                selected_rows=[],
+                page_size=config.DASH_PAGE_SIZE,
+                style_as_list_view=True
+            )
+        ]),
+        # Links de descarga a /export/<search_id>.<formato>; se completan al terminar cada búsqueda
+        html.Div(id="export-links", children=[
+            html.A("Exportar a Excel", id="export-xlsx", className="export-button", download="", target="_blank"),
+            html.A("Exportar a CSV", id="export-csv", className="export-button", download="", target="_blank"),
+            html.A("Exportar a Parquet", id="export-parquet", className="export-button", download="", target="_blank",
+                   style=None if export.PARQUET_AVAILABLE else {'display': 'none'}),
+        ])
     ], style={'display': 'none'}),
 
     html.Div(id="output-seller-container", children=[
@@ -94,450 +178,733 @@ app.layout = html.Div([
 
 ], style={'fontFamily': 'Roboto, sans-serif', 'backgroundColor': '#1e1e1e', 'padding': '40px'})
 
+# Búsquedas ya procesadas, guardadas del lado del servidor y referenciadas desde el navegador por su id
+# (el dcc.Store "search-store" sólo guarda el id, no los datos). Con la caché compartida, cualquier worker
+# de gunicorn puede atender los callbacks de una búsqueda hecha en otro; los DataFrames se guardan con pickle.
+search_results = cache.make_cache("dash_search", maxsize=config.DASH_SEARCH_CACHE_SIZE,
+                                  ttl=config.DASH_SEARCH_CACHE_TTL, serializer="pickle")
+
+# Mensaje y visibilidad de las secciones cuando no hay datos para mostrar
+HIDDEN = {'display': 'none'}
+VISIBLE = {'display': 'block'}
+
+
+# Recupera la búsqueda guardada; si expiró o no existe, no hay nada que actualizar
+def get_search(store):
+    search = search_results.get(store["search_id"]) if store else None
+    if search is None:
+        raise exceptions.PreventUpdate
+    return search
+
+
+# Búsqueda: se ejecuta sólo al hacer clic en "Buscar" (el texto del input es State, no Input).
+# Trae los datos una vez, los procesa y los guarda; el resto de los callbacks derivan de search-store.
 @app.callback(
-    [Output("output-message", "children"),
+    [Output("search-store", "data"),
+     Output("output-message", "children"),
      Output("output-table-container", "style"),
-     Output("output-table", "children"),
      Output("output-seller-container", "style"),
-     Output("output-seller-table", "children"),
      Output("output-graph-container", "style"),
-     Output("output-graph", "children"),
-     Output("download-link", "data"),  # Modificación para manejar la descarga del Excel
-     Output("total-models", "children"),
+     Output("graph-selector-container", "style"),
+     Output("loading-line", "style")],
+    [Input("search-button", "n_clicks")],
+    [State("input-producto", "value")]
+)
+def run_search(n_clicks, producto):
+    if not n_clicks or not producto:
+        raise exceptions.PreventUpdate
+    try:
+        with timed_stage("dash.fetch", producto=producto) as fields:
+            data = fetch_data(producto)
+            fields["items"] = len(data.get("results", []))
+
+        # Ajuste para acceder correctamente a los resultados
+        results = data.get('results', [])
+
+        if not isinstance(results, list) or len(results) == 0:
+            logging.warning(f"No se encontraron resultados en la búsqueda de {producto!r}.")
+            return None, "No se encontraron resultados.", HIDDEN, HIDDEN, HIDDEN, HIDDEN, HIDDEN
+
+        # Una sola consulta de la cotización por búsqueda: se usa para convertir precios y para mostrarla
+        blue_dollar = get_dolar_blue_cotizacion()
+
+        with timed_stage("dash.sellers") as fields:
+            sellers = fetch_sellers(results)
+            fields["sellers"] = len(sellers)
+
+        with timed_stage("dash.prepare_data", items=len(results)) as fields:
+            df, min_price, mid_price, max_price = prepare_data(results, blue_dollar, rows=data.get("rows"))
+            fields["rows"] = len(df)
+        with timed_stage("dash.prepare_seller_data", items=len(results)) as fields:
+            seller_df = prepare_seller_data(results, sellers)
+            fields["sellers"] = len(seller_df)
+        # Estadísticas y bins de precios, guardados con la búsqueda para no recalcularlos en cada gráfico
+        with timed_stage("dash.price_stats", rows=len(df)):
+            stats = price_stats.compute(df["Precio en ARS"])
+
+        # Cálculo de porcentaje de artículos por vendedor
+        seller_df['Porcentaje'] = (seller_df['Cantidad de Artículos'] / seller_df['Cantidad de Artículos'].sum()) * 100
+
+        search_id = uuid.uuid4().hex
+        search_results.set(search_id, {
+            "producto": producto,
+            "df": df,
+            "seller_df": seller_df,
+            "min_price": min_price,
+            "mid_price": mid_price,
+            "max_price": max_price,
+            "price_stats": stats,
+            "catalog_items": sum(1 for item in results if item.get("catalog_listing")),
+            "total_products": len(results),
+            "blue_dollar": blue_dollar or "N/A",
+        })
+        return ({"search_id": search_id, "producto": producto}, "Datos cargados correctamente.",
+                VISIBLE, VISIBLE, VISIBLE, VISIBLE, HIDDEN)
+
+    except Exception as e:
+        logging.error(f"Error durante la obtención de datos: {str(e)}")
+        return None, f"Error al obtener datos: {str(e)}", HIDDEN, HIDDEN, HIDDEN, HIDDEN, HIDDEN
+
+
+# Contadores de la cabecera
+@app.callback(
+    [Output("total-models", "children"),
      Output("catalog-items", "children"),
      Output("total-products", "children"),
      Output("seller-count", "children"),
-     Output("loading-line", "style"),
-     Output("blue-dollar", "children"),
-     Output("graph-selector-container", "style")],
-    [Input("search-button", "n_clicks"),
-     Input("input-producto", "value"),
-     Input("export-button", "n_clicks"),  # Input para manejar el clic en exportar a Excel
-     Input("graph-selector", "value")]
+     Output("blue-dollar", "children")],
+    [Input("search-store", "data")]
 )
-def update_table_and_graph(n_clicks, producto, export_clicks, graph_type):
-    if n_clicks > 0:
-        try:
-            logging.info(f"Buscando producto: {producto}")
-            data = fetch_data(producto)
+def update_counters(store):
+    if not store:
+        return None, None, None, None, None
+    search = get_search(store)
+    return (f"Cantidad de Modelos listados: {search['df']['Modelo'].nunique()}",
+            f"Modelos con publicación de catálogo existente: {search['catalog_items']}",
+            f"Cantidad de productos publicados: {search['total_products']}",
+            f"Vendedores: {search['seller_df']['Vendedor'].nunique()}",
+            f"Cotización Dólar Blue Venta: {search['blue_dollar']} ARS")
+
+
+# Colores de la tabla de productos (según los cortes de precio de la búsqueda) y sección de vendedores (torta + tabla).
+# Una búsqueda nueva vuelve la tabla a la primera página sin orden ni filtros.
+@app.callback(
+    [Output("products-table", "style_data_conditional"),
+     Output("products-table", "page_current"),
+     Output("products-table", "sort_by"),
+     Output("products-table", "filter_query"),
+     Output("output-seller-table", "children")],
+    [Input("search-store", "data")]
+)
+def update_tables(store):
+    if not store:
+        return [], 0, [], "", None
+    search = get_search(store)
+    return (products_table_styles(search["mid_price"], search["max_price"]), 0, [], "",
+            build_seller_section(search["seller_df"]))
 
-            # Ajuste para acceder correctamente a los resultados
-            results = data.get('results', [])
-
-            if isinstance(results, list) and len(results) > 0:
-                logging.info(f"Datos válidos obtenidos: {len(results)} ítems")
-                df, min_price, mid_price, max_price = prepare_data(results)
-                seller_df = prepare_seller_data(results)
-
-                # Contadores actualizados
-                total_models = df["Modelo"].nunique()
-                catalog_items = len([item for item in results if item.get("catalog_listing")])
-                total_products = len(results)
-                seller_count = seller_df["Vendedor"].nunique()
-
-                # Solicitar el valor del dólar blue desde el backend
-                try:
-                    response = requests.get("http://127.0.0.1:8000/dolar/blue")
-                    blue_dollar_data = response.json()
-                    blue_dollar = blue_dollar_data.get("dollar_blue_sale_value", "N/A")
-                except Exception as e:
-                    logging.error(f"Error al obtener la cotización del dólar blue desde el backend: {e}")
-                    blue_dollar = "N/A"
-
-                # Calcular estadísticas adicionales
-                mean_price = df["Precio en ARS"].mean()
-                median_price = df["Precio en ARS"].median()
-
-                # Alternar gráficos basado en la selección
-                if graph_type == "histogram":
-                    fig = px.histogram(df, x="Precio en ARS", title="Distribución de Precios", template="plotly_dark",
-                                       nbins=20)
-                elif graph_type == "boxplot":
-                    fig = px.box(df, y="Precio en ARS", title="Box Plot de Precios", template="plotly_dark")
-                elif graph_type == "barchart":
-                    # Asegurarse de que la columna "Categoría" esté presente
-                    if "Categoría" in df.columns:
-                        categoria_df = df.groupby("Categoría").size().reset_index(name="Cantidad")
-                        fig = px.bar(categoria_df, x="Categoría", y="Cantidad", title="Productos por Categoría",
-                                     template="plotly_dark")
-                    else:
-                        fig = None  # En caso de no tener datos, evitamos pasar un gráfico vacío
-
-                # Si es histograma o boxplot, agregar líneas de referencia para promedio y mediana
-                if fig and graph_type in ["histogram", "boxplot"]:
-                    fig.add_vline(x=mean_price, line_dash="dash", line_color="green",
-                                  annotation_text=f"Promedio: ARS {mean_price:,.2f}")
-                    fig.add_vline(x=median_price, line_dash="dot", line_color="orange",
-                                  annotation_text=f"Mediana: ARS {median_price:,.2f}")
-
-                # Condiciones para colorear las filas de la tabla según precios
-                style_data_conditional = [
-                    {
-                        'if': {'row_index': 'odd'},
-                        'backgroundColor': '#3a3a3a',
-                    },
-                    {
-                        'if': {'row_index': 'even'},
-                        'backgroundColor': '#2e2e2e',
-                    },
-                    {
-                        'if': {'column_id': 'Precio', 'filter_query': f'{{Precio en ARS}} <= {mid_price}'},
-                        'backgroundColor': '#285d6b',
-                        'color': '#ffffff',
-                    },
-                    {
-                        'if': {'column_id': 'Precio',
-                               'filter_query': f'{{Precio en ARS}} > {mid_price} && {{Precio en ARS}} < {max_price}'},
-                        'backgroundColor': '#396f59',
-                        'color': '#ffffff',
-                    },
-                    {
-                        'if': {'column_id': 'Precio', 'filter_query': f'{{Precio en ARS}} >= {max_price}'},
-                        'backgroundColor': '#995b50',
-                        'color': '#ffffff',
-                    },
-                    {
-                        'if': {'filter_query': '{Moneda} = USD', 'column_id': 'Precio'},
-                        'color': '#A3E4D7',
-                        'fontWeight': 'bold',
-                    },
-                    {
-                        'if': {'filter_query': '{Moneda} = ARS', 'column_id': 'Precio'},
-                        'color': '#AEDFF7',
-                        'fontWeight': 'bold',
-                    },
-                ]
-
-                # Tabla de datos de productos con categoría
-                table = dash_table.DataTable(
-                    data=df.to_dict("records"),
-                    columns=[
-                        {"name": "Imagen", "id": "Imagen", "presentation": "markdown"},
-                        {"name": "Artículo", "id": "Artículo"},
-                        {"name": "Categoría", "id": "Categoría"},  # Nueva columna de categoría
-                        {"name": "Marca", "id": "Marca"},
-                        {"name": "Modelo", "id": "Modelo"},
-                        {"name": "Condición", "id": "Condición"},
-                        {"name": "SKU", "id": "SKU"},
-                        {"name": "Precio", "id": "Precio"},
-                        {"name": "Stock Disponible", "id": "Stock Disponible"},
-                        {"name": "Cantidad Vendida", "id": "Cantidad Vendida"},
-                        {"name": "Envío Gratis", "id": "Envío Gratis", "presentation": "markdown"},
-                        {"name": "FULL", "id": "FULL", "presentation": "markdown"},
-                        {"name": "Vendedor", "id": "Vendedor"},
-                        {"name": "Tipo de Publicación", "id": "Tipo de Publicación"},
-                        {"name": "Publicación en Catálogo", "id": "Publicación en Catálogo"},
-                        {"name": "Url", "id": "Ver en MercadoLibre", "presentation": "markdown"},
-                    ],
-                    style_cell={
-                        'padding': '5px',
-                        'whiteSpace': 'normal',
-                        'height': 'auto',
-                        'textAlign': 'left',
-                        'fontFamily': 'Roboto, sans-serif',
-                        'backgroundColor': '#1e1e1e',
-                        'color': '#ffffff',
-                        'maxWidth': '150px',
-                        'overflow': 'hidden',
-                        'textOverflow': 'ellipsis',
-                    },
-                    style_data_conditional=style_data_conditional,
-                    style_header={
-                        'backgroundColor': '#444',
-                        'color': 'white',
-                        'fontWeight': 'bold',
-                        'textAlign': 'center'
-                    },
-                    style_table={'overflowX': 'auto', 'minWidth': '100%', 'maxWidth': '100%'},
-                    markdown_options={'link_target': '_blank'},
-                    row_deletable=False,
-                    editable=False,
-                    sort_action="native",
-                    filter_action="native",
-                    row_selectable="multi",
-                    selected_rows=[],
-                    page_size=10,
-                    style_as_list_view=True
-                )
-
-                # MODIFICACIÓN DE RECUENTO DE VENDEDORES (gráfico + tabla)
-                total_articulos = seller_df['Cantidad de Artículos'].sum()
-
-                # Cálculo de porcentaje de artículos por vendedor
-                seller_df['Porcentaje'] = (seller_df['Cantidad de Artículos'] / total_articulos) * 100
-
-                # Gráfico de torta
-                fig_pie = px.pie(seller_df, names="Vendedor", values="Cantidad de Artículos",
-                                 title="Distribución por Vendedores",
-                                 hole=0.3, template="plotly_dark")
-
-                # Tabla de vendedores con porcentaje y heatmap
-                style_data_conditional_seller = [
-                    {
-                        'if': {'filter_query': f'{{Porcentaje}} >= 50', 'column_id': 'Porcentaje'},
-                        'backgroundColor': '#ff595e',
-                        'color': 'white',
-                    },
-                    {
-                        'if': {'filter_query': f'{{Porcentaje}} >= 25 && {{Porcentaje}} < 50',
-                               'column_id': 'Porcentaje'},
-                        'backgroundColor': '#ffca3a',
-                        'color': 'white',
-                    },
-                    {
-                        'if': {'filter_query': f'{{Porcentaje}} < 25', 'column_id': 'Porcentaje'},
-                        'backgroundColor': '#1982c4',
-                        'color': 'white',
-                    },
-                ]
-
-                # Tabla de vendedores
-                seller_table_with_percentage = dash_table.DataTable(
-                    data=seller_df.to_dict("records"),
-                    columns=[
-                        {"name": "Vendedor", "id": "Vendedor"},
-                        {"name": "Cantidad de Artículos", "id": "Cantidad de Artículos"},
-                        {"name": "Porcentaje (%)", "id": "Porcentaje", "type": "numeric",
-                         "format": {'specifier': '.2f'}}
-                    ],
-                    style_data_conditional=style_data_conditional_seller,
-                    style_cell={
-                        'padding': '10px',
-                        'textAlign': 'left',
-                        'backgroundColor': '#1e1e1e',
-                        'color': '#ffffff'
-                    },
-                    style_header={
-                        'backgroundColor': '#444',
-                        'color': 'white',
-                        'fontWeight': 'bold',
-                        'textAlign': 'center'
-                    },
-                    style_table={'overflowX': 'auto', 'minWidth': '100%', 'maxWidth': '100%'},
-                    page_size=10,
-                )
-
-                # Crear layout dividido: gráfico a la izquierda, tabla a la derecha
-                seller_section = html.Div([
-                    html.Div(dcc.Graph(figure=fig_pie),
-                             style={'width': '45%', 'display': 'inline-block', 'paddingRight': '20px'}),
-                    # Añadir paddingRight
-                    html.Div(seller_table_with_percentage,
-                             style={'width': '45%', 'display': 'inline-block', 'verticalAlign': 'top',
-                                    'paddingLeft': '20px'})  # Añadir paddingLeft
-                ])
-
-                # Lógica de exportación a Excel:
-                if export_clicks > 0:
-                    # Crear archivo Excel en memoria
-                    buffer = io.BytesIO()
-                    with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
-                        df.to_excel(writer, index=False, sheet_name="Resultados")
-                    buffer.seek(0)
-                    # Devolver el archivo para descargar
-                    return ("Datos cargados correctamente.",
-                            {'display': 'block'},
-                            table,
-                            {'display': 'block'},
-                            seller_section,
-                            {'display': 'block'},
-                            dcc.Graph(figure=fig) if fig else "No se encontraron datos para el gráfico.",
-                            dcc.send_bytes(buffer.getvalue(), "resultados_scraping.xlsx"),
-                            # Aquí se envía el archivo Excel
-                            f"Cantidad de Modelos listados: {total_models}",
-                            f"Modelos con publicación de catálogo existente: {catalog_items}",
-                            f"Cantidad de productos publicados: {total_products}",
-                            f"Vendedores: {seller_count}",
-                            {'display': 'none'},  # Ocultar la línea de carga
-                            f"Cotización Dólar Blue Venta: {blue_dollar} ARS",
-                            {'display': 'block'}
-                            )
-
-                # Si no se exporta, retornar sin cambios:
-                return ("Datos cargados correctamente.",
-                        {'display': 'block'},
-                        table,
-                        {'display': 'block'},
-                        seller_section,
-                        {'display': 'block'},
-                        dcc.Graph(figure=fig) if fig else "No se encontraron datos para el gráfico.",
-                        None,  # No se devuelve archivo Excel si no se hizo clic en exportar
-                        f"Cantidad de Modelos listados: {total_models}",
-                        f"Modelos con publicación de catálogo existente: {catalog_items}",
-                        f"Cantidad de productos publicados: {total_products}",
-                        f"Vendedores: {seller_count}",
-                        {'display': 'none'},  # Ocultar la línea de carga
-                        f"Cotización Dólar Blue Venta: {blue_dollar} ARS",
-                        {'display': 'block'})
-
-            else:
-                logging.warning("No se encontraron resultados en la búsqueda.")
-                logging.info(f"Resultados obtenidos: {results}")
-                return ["No se encontraron resultados.",
-                        {'display': 'none'}, None,
-                        {'display': 'none'}, None,
-                        {'display': 'none'}, None,
-                        None, None, None, None, None, None, None, {'display': 'none'}]
-        except Exception as e:
-            logging.error(f"Error durante la obtención de datos: {str(e)}")
-            return [f"Error al obtener datos: {str(e)}",
-                    {'display': 'none'}, None,
-                    {'display': 'none'}, None,
-                    {'display': 'none'}, None,
-                    None, None, None, None, None, None, None, {'display': 'none'}]
-    raise exceptions.PreventUpdate
-
-
-def fetch_data(producto):
-    url = f"http://127.0.0.1:8000/scrape?producto={producto}"
-    logging.info(f"Haciendo solicitud a la URL: {url}")
-    response = requests.get(url)
-    response.raise_for_status()
-    data = response.json()
-    logging.info(f"Datos obtenidos: {data}")  # Verifica los datos obtenidos
-    return data
 
+# Página visible de la tabla de productos: filtra, ordena y recorta en el servidor, de modo que al
+# navegador sólo viaja la página actual sin importar cuántas publicaciones tenga la búsqueda
+@app.callback(
+    [Output("products-table", "data"),
+     Output("products-table", "page_count")],
+    [Input("search-store", "data"),
+     Input("products-table", "page_current"),
+     Input("products-table", "page_size"),
+     Input("products-table", "sort_by"),
+     Input("products-table", "filter_query")]
+)
+def update_products_page(store, page_current, page_size, sort_by, filter_query):
+    if not store:
+        return [], 0
+    search = get_search(store)
+    with measure_stage("dash.table_page"):
+        df = sort_frame(filter_frame(search["df"], filter_query), sort_by)
 
-def get_dolar_blue_cotizacion():
-    try:
-        response = requests.get("https://dolarapi.com/v1/dolares/blue")
-        data = response.json()
-        return data.get("venta", 0)  # Usamos el valor de venta del dólar blue
-    except Exception as e:
-        logging.error(f"Error al obtener la cotización del dólar blue: {e}")
-        return 0  # Devolver 0 o algún valor por defecto en caso de error
+        page_count = max(1, -(-len(df) // page_size))
+        page_current = min(page_current or 0, page_count - 1)
+        start = page_current * page_size
+        return df.iloc[start:start + page_size].to_dict("records"), page_count
 
 
-def prepare_data(results):
-    rows = []
-    dolar_blue_cotizacion = get_dolar_blue_cotizacion()
-    logging.info(f"Cotización del dólar blue obtenida: AR$ {dolar_blue_cotizacion}")
+# Gráfico de precios: cambiar de histograma a box plot sólo recalcula la figura a partir de la búsqueda guardada
+@app.callback(
+    Output("output-graph", "children"),
+    [Input("graph-selector", "value"),
+     Input("search-store", "data")]
+)
+def update_graph(graph_type, store):
+    if not store:
+        return None
+    search = get_search(store)
+    with timed_stage("dash.figure", graph=graph_type, rows=len(search["df"])):
+        fig = build_price_figure(search["df"], graph_type, search.get("price_stats"))
+    return dcc.Graph(figure=fig) if fig else "No se encontraron datos para el gráfico."
 
-    for index, result in enumerate(results):
-        logging.info(f"Procesando resultado #{index + 1}: {result}")
 
-        if not isinstance(result, dict):
-            logging.error(f"Se esperaba un diccionario en 'result', pero se recibió: {type(result)}")
-            continue
+# Links de exportación de la búsqueda guardada (los sirve export_search sin volver a consultar MercadoLibre)
+@app.callback(
+    [Output("export-xlsx", "href"),
+     Output("export-csv", "href"),
+     Output("export-parquet", "href")],
+    [Input("search-store", "data")]
+)
+def update_export_links(store):
+    if not store:
+        return None, None, None
+    return tuple(f"/export/{store['search_id']}.{fmt}" for fmt in ("xlsx", "csv", "parquet"))
+
+
+def build_price_figure(df, graph_type, stats=None):
+    if stats is None and graph_type in ("histogram", "boxplot"):
+        stats = price_stats.compute(df["Precio en ARS"])
+    fig = None
+
+    # Histograma y box plot se dibujan desde las estadísticas precalculadas (bins y cuartiles), no con
+    # un punto por publicación
+    if graph_type == "histogram" and stats:
+        edges = np.asarray(stats["hist_edges"])
+        fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=stats["hist_counts"], width=np.diff(edges),
+                               name="Precio en ARS"))
+        fig.update_layout(title="Distribución de Precios", template="plotly_dark", bargap=0,
+                          xaxis_title="Precio en ARS", yaxis_title="count")
+    elif graph_type == "boxplot" and stats:
+        fig = go.Figure(go.Box(name="Precio en ARS", q1=[stats["q1"]], median=[stats["median"]], q3=[stats["q3"]],
+                               lowerfence=[stats["lower_fence"]], upperfence=[stats["upper_fence"]],
+                               mean=[stats["mean"]], x=["Precio en ARS"]))
+        # Los atípicos se dibujan como puntos WebGL (acotados a price_stats.MAX_OUTLIERS)
+        if stats["outliers"]:
+            fig.add_trace(go.Scattergl(x=["Precio en ARS"] * len(stats["outliers"]), y=stats["outliers"],
+                                       mode="markers", name="Atípicos", marker={"size": 4}))
+        fig.update_layout(title="Box Plot de Precios", template="plotly_dark", yaxis_title="Precio en ARS",
+                          showlegend=False)
+    elif graph_type == "barchart":
+        # Asegurarse de que la columna "Categoría" esté presente
+        if "Categoría" in df.columns:
+            categoria_df = df.groupby("Categoría").size().reset_index(name="Cantidad")
+            fig = px.bar(categoria_df, x="Categoría", y="Cantidad", title="Productos por Categoría",
+                         template="plotly_dark")
+
+    # Si es histograma o boxplot, agregar líneas de referencia para promedio y mediana
+    if fig and graph_type == "histogram":
+        fig.add_vline(x=stats["mean"], line_dash="dash", line_color="green",
+                      annotation_text=f"Promedio: ARS {stats['mean']:,.2f}")
+        fig.add_vline(x=stats["median"], line_dash="dot", line_color="orange",
+                      annotation_text=f"Mediana: ARS {stats['median']:,.2f}")
+    elif fig and graph_type == "boxplot":
+        fig.add_hline(y=stats["mean"], line_dash="dash", line_color="green",
+                      annotation_text=f"Promedio: ARS {stats['mean']:,.2f}")
+        fig.add_hline(y=stats["median"], line_dash="dot", line_color="orange",
+                      annotation_text=f"Mediana: ARS {stats['median']:,.2f}")
+    return fig
+
+
+# Condiciones para colorear las filas de la tabla según precios (los cortes dependen de cada búsqueda)
+def products_table_styles(mid_price, max_price):
+    style_data_conditional = [
+        {
+            'if': {'row_index': 'odd'},
+            'backgroundColor': '#3a3a3a',
+        },
+        {
+            'if': {'row_index': 'even'},
+            'backgroundColor': '#2e2e2e',
+        },
+        {
+            'if': {'column_id': 'Precio', 'filter_query': f'{{Precio en ARS}} <= {mid_price}'},
+            'backgroundColor': '#285d6b',
+            'color': '#ffffff',
+        },
+        {
+            'if': {'column_id': 'Precio',
+                   'filter_query': f'{{Precio en ARS}} > {mid_price} && {{Precio en ARS}} < {max_price}'},
+            'backgroundColor': '#396f59',
+            'color': '#ffffff',
+        },
+        {
+            'if': {'column_id': 'Precio', 'filter_query': f'{{Precio en ARS}} >= {max_price}'},
+            'backgroundColor': '#995b50',
+            'color': '#ffffff',
+        },
+        {
+            'if': {'filter_query': '{Moneda} = USD', 'column_id': 'Precio'},
+            'color': '#A3E4D7',
+            'fontWeight': 'bold',
+        },
+        {
+            'if': {'filter_query': '{Moneda} = ARS', 'column_id': 'Precio'},
+            'color': '#AEDFF7',
+            'fontWeight': 'bold',
+        },
+    ]
+    return style_data_conditional
+
+
+# Columnas formateadas como texto que se ordenan y comparan por su valor numérico
+NUMERIC_SORT_KEYS = {"Precio": "Precio en ARS"}
+
+# Columnas numéricas que pueden traer "No disponible" mezclado con números: se ordenan con los valores
+# convertidos a número y los faltantes al final
+NUMERIC_COLUMNS = frozenset(("Precio en ARS", "Stock Disponible", "Cantidad Vendida"))
+
+# Operadores del filtro de dash_table (los símbolos y sus alias en texto). La tabla les antepone "s" o "i" según
+# filter_options (sensible o no a mayúsculas): "{Precio} s> 1000", "{Marca} i= lg", "{Marca} scontains Sam"
+FILTER_OPERATORS = {
+    "=": "eq", "eq": "eq", "!=": "ne", "ne": "ne",
+    ">": "gt", "gt": "gt", ">=": "ge", "ge": "ge", "<": "lt", "lt": "lt", "<=": "le", "le": "le",
+    "contains": "contains", "datestartswith": "startswith",
+}
+FILTER_CASE_PREFIXES = ("s", "i")
+FILTER_EXPRESSION = re.compile(r"^\{(?P<column>[^}]+)\}\s+(?P<operator>\S+)\s*(?P<value>.*)$")
+
+
+def _filter_value(value):
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'`":
+        return value[1:-1]
+    return value
+
+
+# Máscara vectorizada de pandas para una expresión "{columna} operador valor"
+def _filter_mask(df, expression):
+    match = FILTER_EXPRESSION.match(expression.strip())
+    operator = match.group("operator").lower() if match else ""
+    ignore_case = False
+    if operator not in FILTER_OPERATORS and operator[:1] in FILTER_CASE_PREFIXES:
+        ignore_case = operator[0] == "i"
+        operator = operator[1:]
+    operator = FILTER_OPERATORS.get(operator)
+    if operator is None or match.group("column") not in df.columns:
+        logging.warning(f"Expresión de filtro no soportada: {expression!r}")
+        return None
+
+    column = match.group("column")
+    value = _filter_value(match.group("value"))
+    text = df[column].astype(str)
+    if ignore_case:
+        text, value = text.str.lower(), value.lower()
+    if operator == "startswith":
+        return text.str.startswith(value)
+    if operator == "contains":
+        return text.str.contains(value, regex=False)
+
+    # Comparaciones: numéricas si el valor es un número (sobre la columna numérica asociada), si no de texto
+    try:
+        number = float(value)
+    except ValueError:
+        series, target = text, value
+    else:
+        series, target = pd.to_numeric(df[NUMERIC_SORT_KEYS.get(column, column)], errors="coerce"), number
+    return {
+        "eq": series.__eq__, "ne": series.__ne__, "gt": series.__gt__,
+        "ge": series.__ge__, "lt": series.__lt__, "le": series.__le__,
+    }[operator](target)
+
+
+# Traduce el filter_query de la tabla ("{Marca} contains Sam && {Precio} > 1000") a una máscara vectorizada
+def filter_frame(df, filter_query):
+    if not filter_query:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for expression in filter_query.split(" && "):
+        expression_mask = _filter_mask(df, expression)
+        if expression_mask is not None:
+            mask &= expression_mask.fillna(False).astype(bool)
+    return df[mask]
+
+
+def sort_frame(df, sort_by):
+    if not sort_by:
+        return df
+    columns = [NUMERIC_SORT_KEYS.get(sort["column_id"], sort["column_id"]) for sort in sort_by]
+    ascending = [sort["direction"] == "asc" for sort in sort_by]
+    return df.sort_values(columns, ascending=ascending, kind="stable", na_position="last",
+                          key=lambda series: pd.to_numeric(series, errors="coerce")
+                          if series.name in NUMERIC_COLUMNS else series)
+
+
+def build_seller_section(seller_df):
+    # Gráfico de torta
+    fig_pie = px.pie(seller_df, names="Vendedor", values="Cantidad de Artículos",
+                     title="Distribución por Vendedores",
+                     hole=0.3, template="plotly_dark")
+
+    # Tabla de vendedores con porcentaje y heatmap
+    style_data_conditional_seller = [
+        {
+            'if': {'filter_query': f'{{Porcentaje}} >= 50', 'column_id': 'Porcentaje'},
+            'backgroundColor': '#ff595e',
+            'color': 'white',
+        },
+        {
+            'if': {'filter_query': f'{{Porcentaje}} >= 25 && {{Porcentaje}} < 50',
+                   'column_id': 'Porcentaje'},
+            'backgroundColor': '#ffca3a',
+            'color': 'white',
+        },
+        {
+            'if': {'filter_query': f'{{Porcentaje}} < 25', 'column_id': 'Porcentaje'},
+            'backgroundColor': '#1982c4',
+            'color': 'white',
+        },
+    ]
+
+    # Tabla de vendedores
+    seller_table_with_percentage = dash_table.DataTable(
+        data=seller_df.to_dict("records"),
+        columns=[
+            {"name": "Vendedor", "id": "Vendedor"},
+            {"name": "Cantidad de Artículos", "id": "Cantidad de Artículos"},
+            {"name": "Porcentaje (%)", "id": "Porcentaje", "type": "numeric",
+             "format": {'specifier': '.2f'}},
+            {"name": "Reputación", "id": "Reputación"},
+            {"name": "MercadoLíder", "id": "MercadoLíder"},
+            {"name": "Ubicación", "id": "Ubicación"},
+            {"name": "Ventas Concretadas", "id": "Ventas Concretadas", "type": "numeric"},
+        ],
+        style_data_conditional=style_data_conditional_seller,
+        style_cell={
+            'padding': '10px',
+            'textAlign': 'left',
+            'backgroundColor': '#1e1e1e',
+            'color': '#ffffff'
+        },
+        style_header={
+            'backgroundColor': '#444',
+            'color': 'white',
+            'fontWeight': 'bold',
+            'textAlign': 'center'
+        },
+        style_table={'overflowX': 'auto', 'minWidth': '100%', 'maxWidth': '100%'},
+        page_size=10,
+    )
+
+    # Crear layout dividido: gráfico a la izquierda, tabla a la derecha
+    seller_section = html.Div([
+        html.Div(dcc.Graph(figure=fig_pie),
+                 style={'width': '45%', 'display': 'inline-block', 'paddingRight': '20px'}),
+        # Añadir paddingRight
+        html.Div(seller_table_with_percentage,
+                 style={'width': '45%', 'display': 'inline-block', 'verticalAlign': 'top',
+                        'paddingLeft': '20px'})  # Añadir paddingLeft
+    ])
+    return seller_section
+
+
+# Headers de los requests al backend: se negocia la compresión de las respuestas
+BACKEND_HEADERS = {"Accept-Encoding": compression.ACCEPT_ENCODING}
+
+# Última respuesta del backend por request (ETag y cuerpo ya parseado): se vuelve a pedir con If-None-Match y,
+# si no cambió (304), se reutiliza sin descargarla ni parsearla de nuevo
+backend_responses = cache.TTLCache(maxsize=config.DASH_SEARCH_CACHE_SIZE * 2, ttl=config.DASH_SEARCH_CACHE_TTL,
+                                   name="dash_validators")
+
+
+# Headers del request y respuesta guardada (etag, valor) para pedirla de forma condicional
+def conditional_request(key):
+    saved = backend_responses.get(key)
+    if saved is None:
+        return BACKEND_HEADERS, None
+    return {**BACKEND_HEADERS, "If-None-Match": saved[0]}, saved
+
+
+# Itera los productos de /scrape/stream a medida que llegan (NDJSON: un ítem por línea)
+def iter_data(producto, max_items=None):
+    url = f"{config.BACKEND_URL}/scrape/stream"
+    params = {"producto": producto}
+    if max_items:
+        params["max_items"] = max_items
+    if config.DASH_ITEM_DETAILS:
+        params["details"] = "true"
+    key = ("scrape/stream", tuple(sorted(params.items())))
+    headers, saved = conditional_request(key)
+    with requests.get(url, params=params, headers=headers, stream=True) as response:
+        if response.status_code == 304 and saved is not None:
+            log_stage("dash.fetch_not_modified", producto=producto, items=len(saved[1]))
+            yield from saved[1]
+            return
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        items = []
+        for line in response.iter_lines():
+            if line:
+                item = fastjson.loads(line)
+                items.append(item)
+                yield item
+        # Sólo las respuestas servidas desde la caché del backend traen ETag
+        if etag:
+            backend_responses.set(key, (etag, items))
+
+
+# Consume /scrape/stream a medida que llega: cada ítem se convierte en su fila de la tabla (_product_row) apenas
+# se parsea, así el armado de filas se solapa con la descarga en lugar de empezar con la respuesta completa.
+# Devuelve los resultados y, en "rows", las filas ya armadas para prepare_data.
+def fetch_data(producto, max_items=None):
+    results = []
+    rows = []
+    for item in iter_data(producto, max_items or config.DASH_MAX_ITEMS):
+        results.append(item)
+        row = _product_row(item)
+        if row is not None:
+            rows.append(row)
+    log_utils.payloads.capture("dash.fetch", {"results": results})
+    return {"results": results, "rows": rows}
 
-        attributes = result.get("attributes", [])
-        if not isinstance(attributes, list):
-            logging.error(f"Esperaba una lista de atributos, pero obtuve: {type(attributes)} - {attributes}")
-            continue
 
-        title = result.get("title", "Título no disponible")
-        brand = "Marca no disponible"
-        model = "Modelo no disponible"
-        sku = "SKU no disponible"
-
-        # Extraer la categoría del producto del campo domain_id
-        domain_id = result.get("domain_id", "")
-        categoria = domain_id.split("-")[-1] if "-" in domain_id else "Categoría desconocida"
-
-        for attr in attributes:
-            if isinstance(attr, dict):
-                if attr.get("id") == "BRAND":
-                    brand = attr.get("value_name", "Marca no disponible")
-                elif attr.get("id") in ["MODEL", "ALPHANUMERIC_MODEL"]:
-                    model = attr.get("value_name", "Modelo no disponible")
-                elif attr.get("id") == "ALPHANUMERIC_MODEL":
-                    sku = attr.get("value_name", "SKU no disponible")
-            else:
-                logging.error(f"El atributo no es un diccionario: {attr}")
-
-        shipping = result.get("shipping", {})
-        if isinstance(shipping, dict):
-            free_shipping = "🚚" if shipping.get("free_shipping") else "❌"
-            full = "📦" if "fulfillment" in shipping.get("tags", []) else "❌"
-        else:
-            logging.error(f"'shipping' no es un diccionario: {type(shipping)} - {shipping}")
-            free_shipping = "❌"
-            full = "❌"
+# Cotización del dólar blue leída del backend (que la mantiene en memoria) en lugar de DólarAPI
+def get_dolar_blue_cotizacion():
+    try:
+        headers, saved = conditional_request("dolar/blue")
+        response = requests.get(f"{config.BACKEND_URL}/dolar/blue", headers=headers)
+        if response.status_code == 304 and saved is not None:
+            return saved[1]
+        response.raise_for_status()
+        data = fastjson.loads(response.content)
+        value = data.get("dollar_blue_sale_value") or 0  # Usamos el valor de venta del dólar blue
+        if response.headers.get("ETag"):
+            backend_responses.set("dolar/blue", (response.headers["ETag"], value))
+        return value
+    except Exception as e:
+        logging.error(f"Error al obtener la cotización del dólar blue: {e}")
+        return 0  # Devolver 0 o algún valor por defecto en caso de error
 
-        seller = result.get("seller", {})
-        if isinstance(seller, dict):
-            seller_name = seller.get("nickname", "Desconocido")
+
+# Directorio de los vendedores de una búsqueda (reputación, ubicación, ventas) resuelto por el backend
+# en pocos requests; si falla, la tabla de vendedores se arma sólo con lo que traen los resultados
+def fetch_sellers(results):
+    seller_ids = list({result["seller"]["id"] for result in results
+                       if isinstance(result.get("seller"), dict) and result["seller"].get("id") is not None})
+    if not seller_ids:
+        return {}
+    try:
+        response = requests.post(f"{config.BACKEND_URL}/sellers", json={"ids": seller_ids},
+                                 headers=BACKEND_HEADERS)
+        response.raise_for_status()
+        return fastjson.loads(response.content).get("sellers", {})
+    except Exception as e:
+        logging.error(f"Error al obtener los datos de los vendedores: {e}")
+        return {}
+
+
+# Atributos de MercadoLibre que se muestran en la tabla
+BRAND_ATTRIBUTE = "BRAND"
+MODEL_ATTRIBUTES = ("MODEL", "ALPHANUMERIC_MODEL")
+# SKU: el del vendedor (atributo SELLER_SKU o seller_custom_field, que trae el detalle de la publicación)
+# y, si no hay, el modelo alfanumérico
+SKU_ATTRIBUTES = ("SELLER_SKU", "ALPHANUMERIC_MODEL")
+TABLE_ATTRIBUTES = frozenset((BRAND_ATTRIBUTE,) + SKU_ATTRIBUTES + MODEL_ATTRIBUTES)
+
+# Columnas de la tabla de productos, en el orden en que se extraen de cada resultado
+PRODUCT_COLUMNS = ["Imagen", "Artículo", "Categoría", "Marca", "Modelo", "Condición", "SKU", "Precio", "Moneda",
+                   "Stock Disponible", "Cantidad Vendida", "Envío Gratis", "FULL", "Vendedor",
+                   "Tipo de Publicación", "Publicación en Catálogo", "Ver en MercadoLibre"]
+# Columnas del DataFrame de productos: las anteriores más el precio convertido a pesos, después de la moneda
+PRICE_INDEX = PRODUCT_COLUMNS.index("Precio")
+CURRENCY_INDEX = PRODUCT_COLUMNS.index("Moneda")
+PRODUCT_FRAME_COLUMNS = (PRODUCT_COLUMNS[:PRODUCT_COLUMNS.index("Moneda") + 1] + ["Precio en ARS"]
+                         + PRODUCT_COLUMNS[PRODUCT_COLUMNS.index("Moneda") + 1:])
+
+
+# Extrae de un resultado los valores de PRODUCT_COLUMNS; None si el resultado no tiene la forma esperada
+def _product_row(result):
+    if not isinstance(result, dict):
+        logging.error(f"Se esperaba un diccionario en 'result', pero se recibió: {type(result)}")
+        return None
+
+    attributes = result.get("attributes", [])
+    if not isinstance(attributes, list):
+        logging.error(f"Esperaba una lista de atributos, pero obtuve: {type(attributes)} - {attributes}")
+        return None
+
+    # Mapa id -> valor sólo con los atributos que muestra la tabla
+    attribute_map = {}
+    for attr in attributes:
+        if isinstance(attr, dict):
+            attr_id = attr.get("id")
+            if attr_id in TABLE_ATTRIBUTES:
+                attribute_map[attr_id] = attr.get("value_name")
         else:
-            logging.error(f"'seller' no es un diccionario: {type(seller)} - {seller}")
-            seller_name = "Desconocido"
-
-        listing_type = result.get("listing_type_id", "Tipo no disponible")
-
-        catalog_listing = "✅" if result.get("catalog_listing") else "❌"
-
-        image_url = result.get("thumbnail", "https://via.placeholder.com/150")
-        permalink = result.get("permalink", "#")
-
-        image_md = f"![Image]({image_url})"
-
-        currency = result.get("currency_id", "ARS")
-
-        price_in_ars = result.get('price', 0)
-        if currency == "USD":
-            price_in_ars *= dolar_blue_cotizacion
-
-        rows.append({
-            "Imagen": image_md,
-            "Artículo": title,
-            "Categoría": categoria,  # Ahora se añade correctamente la categoría
-            "Marca": brand,
-            "Modelo": model,
-            "Condición": "Nuevo" if result.get("condition", "new") == "new" else "Usado",
-            "SKU": sku,
-            "Precio": result.get('price', 0),
-            "Moneda": currency,
-            "Precio en ARS": price_in_ars,
-            "Stock Disponible": result.get("available_quantity", "No disponible"),
-            "Cantidad Vendida": result.get("sold_quantity", "No disponible"),
-            "Envío Gratis": free_shipping,
-            "FULL": full,
-            "Vendedor": seller_name,
-            "Tipo de Publicación": listing_type,
-            "Publicación en Catálogo": catalog_listing,
-            "Ver en MercadoLibre": f"[Link]({permalink})"
-        })
+            logging.error(f"El atributo no es un diccionario: {attr}")
+
+    # Extraer la categoría del producto del campo domain_id
+    domain_id = result.get("domain_id") or ""
+    categoria = domain_id.rsplit("-", 1)[-1] if "-" in domain_id else "Categoría desconocida"
+
+    shipping = result.get("shipping", {})
+    if isinstance(shipping, dict):
+        free_shipping = "🚚" if shipping.get("free_shipping") else "❌"
+        full = "📦" if "fulfillment" in (shipping.get("tags") or []) else "❌"
+    else:
+        logging.error(f"'shipping' no es un diccionario: {type(shipping)} - {shipping}")
+        free_shipping = full = "❌"
+
+    seller = result.get("seller", {})
+    if isinstance(seller, dict):
+        seller_name = seller.get("nickname", "Desconocido")
+    else:
+        logging.error(f"'seller' no es un diccionario: {type(seller)} - {seller}")
+        seller_name = "Desconocido"
+
+    model = "Modelo no disponible"
+    for attr_id in MODEL_ATTRIBUTES:
+        if attr_id in attribute_map:
+            model = attribute_map[attr_id]
+            break
+
+    sku = attribute_map.get("SELLER_SKU") or result.get("seller_custom_field")
+    if not sku:
+        sku = attribute_map.get("ALPHANUMERIC_MODEL", "SKU no disponible")
+
+    return (
+        f"![Image]({result.get('thumbnail', 'https://via.placeholder.com/150')})",
+        result.get("title", "Título no disponible"),
+        categoria,
+        attribute_map.get(BRAND_ATTRIBUTE, "Marca no disponible"),
+        model,
+        "Nuevo" if result.get("condition", "new") == "new" else "Usado",
+        sku,
+        result.get("price", 0),
+        result.get("currency_id", "ARS"),
+        result.get("available_quantity", "No disponible"),
+        result.get("sold_quantity", "No disponible"),
+        free_shipping,
+        full,
+        seller_name,
+        result.get("listing_type_id", "Tipo no disponible"),
+        "✅" if result.get("catalog_listing") else "❌",
+        f"[Link]({result.get('permalink', '#')})",
+    )
+
+
+# Arma el DataFrame de productos por columnas: una sola pasada extrae los campos de cada resultado
+# (los atributos se resuelven con un mapa id -> valor) y la conversión de moneda y el formato del
+# precio se calculan vectorizados sobre la columna completa. `rows` son las filas ya extraídas mientras
+# llegaba el stream (fetch_data); si no se pasan se extraen de `results`.
+def prepare_data(results, dolar_blue_cotizacion=None, rows=None):
+    if dolar_blue_cotizacion is None:
+        dolar_blue_cotizacion = get_dolar_blue_cotizacion()
+    logging.info(f"Cotización del dólar blue obtenida: AR$ {dolar_blue_cotizacion}")
 
+    if rows is None:
+        rows = [row for row in map(_product_row, results) if row is not None]
     if not rows:
         logging.warning("No se pudieron preparar filas para los datos obtenidos.")
 
-    df = pd.DataFrame(rows)
-    df["Precio en ARS"] = pd.to_numeric(df["Precio en ARS"])
-
-    min_price = df["Precio en ARS"].min()
-    max_price = df["Precio en ARS"].max()
+    # Conversión, orden por precio y formato sobre arrays/listas antes de armar el DataFrame una sola vez:
+    # con pocas filas (el caso común del dashboard) el costo fijo de cada operación de pandas es lo que pesa
+    price = np.asarray([row[PRICE_INDEX] for row in rows], dtype=float)
+    currency = np.asarray([row[CURRENCY_INDEX] for row in rows], dtype=object)
+    price_ars = np.where(currency == "USD", price * dolar_blue_cotizacion, price)
+    order = np.argsort(price_ars, kind="stable")
+    rows = [rows[index] for index in order]
+    price, currency, price_ars = price[order], currency[order], price_ars[order]
+
+    data = dict(zip(PRODUCT_COLUMNS, zip(*rows))) if rows else {column: () for column in PRODUCT_COLUMNS}
+    data["Precio en ARS"] = price_ars
+    data["Precio"] = [f"{'AR$' if code == 'ARS' else 'USD'} {value:,.2f}" for code, value in zip(currency, price)]
+    df = pd.DataFrame(data, columns=PRODUCT_FRAME_COLUMNS)
+
+    valid = price_ars[~np.isnan(price_ars)]
+    min_price = valid.min() if valid.size else np.nan
+    max_price = valid.max() if valid.size else np.nan
     mid_price = (min_price + max_price) / 2
 
-    df = df.sort_values(by=["Precio en ARS"], ascending=True).reset_index(drop=True)
-    df["Precio"] = df.apply(lambda x: f"{'AR$' if x['Moneda'] == 'ARS' else 'USD'} {x['Precio']:,.2f}", axis=1)
-
     return df, min_price, mid_price, max_price
 
 
-def prepare_seller_data(results):
-    seller_counts = {}
+# Etiquetas de la reputación de MercadoLibre (level_id) y del estado MercadoLíder (power_seller_status)
+REPUTATION_LEVELS = {"5_green": "Verde", "4_light_green": "Verde claro", "3_yellow": "Amarilla",
+                     "2_orange": "Naranja", "1_red": "Roja"}
+POWER_SELLER_STATUS = {"platinum": "Platinum", "gold": "Gold", "silver": "Líder"}
 
-    for result in results:
-        seller = result.get("seller", {}).get("nickname", "Desconocido")  # Obtener el nickname del vendedor
-        seller_reputation = result.get("seller", {}).get("seller_reputation", {}).get("level_id", "Sin categoría")
 
-        if seller in seller_counts:
-            seller_counts[seller]['count'] += 1
-        else:
-            seller_counts[seller] = {
-                'count': 1,
-                'type': seller_reputation
-            }
+# Artículos por vendedor; `sellers` es el directorio del backend ({seller_id: resumen}) con la reputación,
+# ubicación y ventas que los resultados de búsqueda no suelen traer
+def prepare_seller_data(results, sellers=None):
+    sellers = sellers or {}
+    seller_rows = {}
 
-    seller_df = pd.DataFrame([
-        {
-            "Vendedor": seller,
-            "Cantidad de Artículos": info['count'],
+    for result in results:
+        seller = result.get("seller") or {}
+        seller_id = seller.get("id")
+        info = sellers.get(str(seller_id)) or {}
+        nickname = seller.get("nickname") or info.get("nickname") or "Desconocido"
+        key = nickname if seller_id is None else seller_id
+
+        if key in seller_rows:
+            seller_rows[key]["Cantidad de Artículos"] += 1
+            continue
+        level_id = (seller.get("seller_reputation") or {}).get("level_id") or info.get("level_id")
+        location = ", ".join(part for part in (info.get("city"), info.get("state")) if part)
+        seller_rows[key] = {
+            "Vendedor": nickname,
+            "Cantidad de Artículos": 1,
+            "Reputación": REPUTATION_LEVELS.get(level_id, "Sin categoría"),
+            "MercadoLíder": POWER_SELLER_STATUS.get(info.get("power_seller_status"), "No"),
+            "Ubicación": location or "No disponible",
+            "Ventas Concretadas": info.get("transactions_completed"),
         }
-        for seller, info in seller_counts.items()
-    ])
+
+    seller_df = pd.DataFrame(list(seller_rows.values()))
     seller_df = seller_df.sort_values(by="Cantidad de Artículos", ascending=False).reset_index(drop=True)
     return seller_df
 
 
+# Exportación en streaming (CSV/NDJSON por bloques, XLSX/Parquet en modo de memoria constante)
+# de una búsqueda ya procesada, identificada por su search id
+@app.server.route("/export/<search_id>.<fmt>")
+def export_search(search_id, fmt):
+    search = search_results.get(search_id)
+    if search is None:
+        return flask.jsonify({"error": "La búsqueda no existe o expiró"}), 404
+    try:
+        body, mimetype, filename = export.export_frame(search["df"], fmt)
+    except export.ExportError as e:
+        return flask.jsonify({"error": str(e)}), 400 if fmt not in export.FORMATS else 501
+    log_stage("dash.export", search_id=search_id, format=fmt, rows=len(search["df"]))
+    return flask.Response(body, mimetype=mimetype,
+                          headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+# Server-Timing y duración de cada request del servidor Flask (callbacks de Dash incluidos), como en el backend.
+# En las respuestas de los callbacks también se registra su tamaño (tablas y figuras serializadas).
+@app.server.before_request
+def start_request_timing():
+    flask.g.request_start = time.perf_counter()
+    flask.g.timings_token = log_utils.start_request_timings()
+
+
+@app.server.after_request
+def add_server_timing(response):
+    token = flask.g.pop("timings_token", None)
+    if token is None:
+        return response
+    timings = log_utils.finish_request_timings(token)
+    total_ms = (time.perf_counter() - flask.g.request_start) * 1000
+    rule = flask.request.url_rule.rule if flask.request.url_rule else "other"
+    metrics.http_request_seconds.observe(total_ms / 1000, route=rule, status=response.status_code)
+    if rule.endswith("_dash-update-component") and response.content_length is not None:
+        metrics.stage_payload_bytes.observe(response.content_length, stage="dash.callback_response")
+        metrics.stage_last_payload_bytes.set(response.content_length, stage="dash.callback_response")
+    response.headers["Server-Timing"] = log_utils.server_timing_header(timings, total_ms)
+    return response
+
+
+# Métricas del dashboard en formato Prometheus
+@app.server.route("/metrics")
+def dash_metrics():
+    metrics.cache_entries.set(len(search_results), cache="dash_search")
+    return flask.Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+
+# Payloads capturados (muestreados) para depuración; requiere LOG_CAPTURE_PAYLOADS=1
+@app.server.route("/debug/payloads")
+def debug_payloads():
+    stage = flask.request.args.get("stage")
+    limit = flask.request.args.get("limit", 20, type=int)
+    return flask.jsonify({"enabled": log_utils.payloads.enabled, "entries": log_utils.payloads.entries(stage, limit)})
+
+
 if __name__ == "__main__":
     app.run_server(debug=True, host="0.0.0.0", port=8050)
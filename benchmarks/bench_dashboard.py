@@ -0,0 +1,86 @@
+import argparse
+import json
+import logging
+import time
+
+from benchmarks.harness import Backend, free_port
+from benchmarks.stub_server import StubServer
+
+# Tiempo de punta a punta de una búsqueda en el dashboard contra backend + stub: los callbacks que dispara
+# el botón (run_search y los que dependen de search-store: contadores, tablas, página de productos, gráfico),
+# más la serialización JSON de sus salidas, que es lo que Dash envía al navegador.
+# Uso: python -m benchmarks.bench_dashboard [--sizes 50 200 1000] [--repeat 3] [--json]
+
+GRAPH_TYPES = ("histogram", "boxplot", "barchart")
+
+
+def _timed(timings, stage, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+    return result
+
+
+def run_once(dash_app, producto):
+    from plotly.utils import PlotlyJSONEncoder
+
+    timings = {}
+    outputs = _timed(timings, "run_search_ms", dash_app.run_search, 1, producto)
+    store = outputs[0]
+    if not store:
+        raise RuntimeError(f"La búsqueda {producto!r} no devolvió resultados")
+
+    outputs += _timed(timings, "update_counters_ms", dash_app.update_counters, store)
+    outputs += _timed(timings, "update_tables_ms", dash_app.update_tables, store)
+    outputs += _timed(timings, "update_products_page_ms", dash_app.update_products_page, store, 0,
+                      dash_app.config.DASH_PAGE_SIZE, [], "")
+    for graph_type in GRAPH_TYPES:
+        outputs += (_timed(timings, "update_graph_ms", dash_app.update_graph, graph_type, store),)
+
+    body = _timed(timings, "serialize_ms", lambda: json.dumps(outputs, cls=PlotlyJSONEncoder))
+    timings["total_ms"] = sum(timings.values())
+    timings["payload_bytes"] = len(body)
+    return timings
+
+
+def run(sizes=(50, 200, 1000), repeat=3, latency_ms=0.0):
+    report = []
+    with StubServer(free_port(), max(sizes), latency_ms) as stub:
+        with Backend(stub, UPSTREAM_RATE_PER_SECOND=1_000_000, UPSTREAM_BURST=1_000_000) as backend:
+            import app as dash_app
+
+            # config puede estar importado de antes (run_all), así que la URL se fija sobre el módulo
+            dash_app.config.BACKEND_URL = backend.url
+
+            for size in sizes:
+                dash_app.config.DASH_MAX_ITEMS = size
+                # Cada repetición es una búsqueda distinta, así el backend no responde desde su caché
+                runs = [run_once(dash_app, f"bench dashboard {size} {time.time_ns()}") for _ in range(repeat)]
+                best = min(runs, key=lambda timings: timings["total_ms"])
+                report.append({"items": size, "repeat": repeat, **best})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de punta a punta de una búsqueda en el dashboard")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latencia del stub por página")
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    report = run(args.sizes, args.repeat, args.latency_ms)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'items':>6} {'search':>8} {'tables':>8} {'page':>7} {'graphs':>8} {'json':>7} {'total (ms)':>11} {'KB':>7}")
+    for row in report:
+        print(f"{row['items']:>6} {row['run_search_ms']:>8.1f} {row['update_tables_ms']:>8.1f} "
+              f"{row['update_products_page_ms']:>7.1f} {row['update_graph_ms']:>8.1f} {row['serialize_ms']:>7.1f} "
+              f"{row['total_ms']:>11.1f} {row['payload_bytes'] / 1024:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import json
+import time
+
+import fastjson
+from benchmarks.fixtures import make_listings
+
+# Codificación y decodificación de payloads de búsqueda: librería estándar contra la capa fastjson
+# (orjson si está instalado). Uso: python -m benchmarks.bench_json [--sizes 50 1000 10000] [--json]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def stdlib_dumps(payload):
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def run(sizes, repeat):
+    report = []
+    for size in sizes:
+        payload = {"results": make_listings(size), "paging": {"total": size}}
+        body = stdlib_dumps(payload)
+        encode_std = best_of(lambda: stdlib_dumps(payload), repeat)
+        encode_fast = best_of(lambda: fastjson.dumps(payload), repeat)
+        decode_std = best_of(lambda: json.loads(body), repeat)
+        decode_fast = best_of(lambda: fastjson.loads(body), repeat)
+        report.append({"listings": size, "engine": fastjson.ENGINE, "bytes": len(body),
+                       "encode_stdlib_s": encode_std, "encode_s": encode_fast, "encode_speedup": encode_std / encode_fast,
+                       "decode_stdlib_s": decode_std, "decode_s": decode_fast, "decode_speedup": decode_std / decode_fast})
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de serialización JSON")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.repeat)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"motor: {fastjson.ENGINE}")
+    print(f"{'listings':>10} {'MB':>6} {'encode std/fast (ms)':>22} {'speedup':>8} {'decode std/fast (ms)':>22} "
+          f"{'speedup':>8}")
+    for row in report:
+        encode = f"{row['encode_stdlib_s'] * 1000:.1f}/{row['encode_s'] * 1000:.1f}"
+        decode = f"{row['decode_stdlib_s'] * 1000:.1f}/{row['decode_s'] * 1000:.1f}"
+        print(f"{row['listings']:>10} {row['bytes'] / 1e6:>6.2f} {encode:>22} {row['encode_speedup']:>7.1f}x "
+              f"{decode:>22} {row['decode_speedup']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import argparse
+import json
+import logging
+import time
+
+import pandas as pd
+
+from app import prepare_data, prepare_seller_data
+from benchmarks.fixtures import make_listings
+
+# Micro-benchmark de prepare_data (armado por columnas contra el loop fila por fila original) y de
+# prepare_seller_data. Uso: python -m benchmarks.bench_prepare_data [--sizes 50 1000 50000] [--skip-legacy] [--json]
+
+DOLAR_BLUE = 1200.0
+
+
+# Implementación anterior de prepare_data (sin el log por fila), como referencia de la comparación
+def prepare_data_legacy(results, dolar_blue_cotizacion):
+    rows = []
+
+    for index, result in enumerate(results):
+        if not isinstance(result, dict):
+            logging.error(f"Se esperaba un diccionario en 'result', pero se recibió: {type(result)}")
+            continue
+
+        attributes = result.get("attributes", [])
+        if not isinstance(attributes, list):
+            logging.error(f"Esperaba una lista de atributos, pero obtuve: {type(attributes)} - {attributes}")
+            continue
+
+        title = result.get("title", "Título no disponible")
+        brand = "Marca no disponible"
+        model = "Modelo no disponible"
+        sku = "SKU no disponible"
+
+        # Extraer la categoría del producto del campo domain_id
+        domain_id = result.get("domain_id", "")
+        categoria = domain_id.split("-")[-1] if "-" in domain_id else "Categoría desconocida"
+
+        for attr in attributes:
+            if isinstance(attr, dict):
+                if attr.get("id") == "BRAND":
+                    brand = attr.get("value_name", "Marca no disponible")
+                elif attr.get("id") in ["MODEL", "ALPHANUMERIC_MODEL"]:
+                    model = attr.get("value_name", "Modelo no disponible")
+                elif attr.get("id") == "ALPHANUMERIC_MODEL":
+                    sku = attr.get("value_name", "SKU no disponible")
+            else:
+                logging.error(f"El atributo no es un diccionario: {attr}")
+
+        shipping = result.get("shipping", {})
+        if isinstance(shipping, dict):
+            free_shipping = "🚚" if shipping.get("free_shipping") else "❌"
+            full = "📦" if "fulfillment" in shipping.get("tags", []) else "❌"
+        else:
+            logging.error(f"'shipping' no es un diccionario: {type(shipping)} - {shipping}")
+            free_shipping = "❌"
+            full = "❌"
+
+        seller = result.get("seller", {})
+        if isinstance(seller, dict):
+            seller_name = seller.get("nickname", "Desconocido")
+        else:
+            logging.error(f"'seller' no es un diccionario: {type(seller)} - {seller}")
+            seller_name = "Desconocido"
+
+        listing_type = result.get("listing_type_id", "Tipo no disponible")
+
+        catalog_listing = "✅" if result.get("catalog_listing") else "❌"
+
+        image_url = result.get("thumbnail", "https://via.placeholder.com/150")
+        permalink = result.get("permalink", "#")
+
+        image_md = f"![Image]({image_url})"
+
+        currency = result.get("currency_id", "ARS")
+
+        price_in_ars = result.get('price', 0)
+        if currency == "USD":
+            price_in_ars *= dolar_blue_cotizacion
+
+        rows.append({
+            "Imagen": image_md,
+            "Artículo": title,
+            "Categoría": categoria,  # Ahora se añade correctamente la categoría
+            "Marca": brand,
+            "Modelo": model,
+            "Condición": "Nuevo" if result.get("condition", "new") == "new" else "Usado",
+            "SKU": sku,
+            "Precio": result.get('price', 0),
+            "Moneda": currency,
+            "Precio en ARS": price_in_ars,
+            "Stock Disponible": result.get("available_quantity", "No disponible"),
+            "Cantidad Vendida": result.get("sold_quantity", "No disponible"),
+            "Envío Gratis": free_shipping,
+            "FULL": full,
+            "Vendedor": seller_name,
+            "Tipo de Publicación": listing_type,
+            "Publicación en Catálogo": catalog_listing,
+            "Ver en MercadoLibre": f"[Link]({permalink})"
+        })
+
+    if not rows:
+        logging.warning("No se pudieron preparar filas para los datos obtenidos.")
+
+    df = pd.DataFrame(rows)
+    df["Precio en ARS"] = pd.to_numeric(df["Precio en ARS"])
+
+    min_price = df["Precio en ARS"].min()
+    max_price = df["Precio en ARS"].max()
+    mid_price = (min_price + max_price) / 2
+
+    df = df.sort_values(by=["Precio en ARS"], ascending=True).reset_index(drop=True)
+    df["Precio"] = df.apply(lambda x: f"{'AR$' if x['Moneda'] == 'ARS' else 'USD'} {x['Precio']:,.2f}", axis=1)
+
+    return df, min_price, mid_price, max_price
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(sizes, repeat, legacy=True):
+    report = []
+    for size in sizes:
+        listings = make_listings(size)
+        columnar = best_of(lambda: prepare_data(listings, DOLAR_BLUE), repeat)
+        sellers = best_of(lambda: prepare_seller_data(listings), repeat)
+        row = {"listings": size, "columnar_s": columnar, "items_per_s": size / columnar, "seller_s": sellers,
+               "seller_items_per_s": size / sellers}
+        if legacy:
+            row["legacy_s"] = best_of(lambda: prepare_data_legacy(listings, DOLAR_BLUE), repeat)
+            row["speedup"] = row["legacy_s"] / columnar
+        report.append(row)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de prepare_data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-legacy", action="store_true", help="no mide la implementación anterior")
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    report = run(args.sizes, args.repeat, legacy=not args.skip_legacy)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'listings':>10} {'legacy (ms)':>12} {'columnar (ms)':>14} {'speedup':>8} {'sellers (ms)':>13}")
+    for row in report:
+        legacy = f"{row['legacy_s'] * 1000:>12.2f}" if "legacy_s" in row else f"{'-':>12}"
+        speedup = f"{row['speedup']:>7.1f}x" if "speedup" in row else f"{'-':>8}"
+        print(f"{row['listings']:>10} {legacy} {row['columnar_s'] * 1000:>14.2f} {speedup} "
+              f"{row['seller_s'] * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
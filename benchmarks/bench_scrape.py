@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from benchmarks.harness import Backend, free_port, latency_summary
+from benchmarks.stub_server import StubServer
+
+# Latencia y throughput de /scrape contra el stub, con distintos niveles de concurrencia.
+# "cold": cada request es una búsqueda distinta (caché fría, va al stub); "warm": siempre la misma (HIT).
+# El rate limit de upstream se desactiva para medir el backend y no el token bucket.
+# Uso: python -m benchmarks.bench_scrape [--items 200] [--latency-ms 80] [--concurrency 1 8 32] [--json]
+
+
+async def load(url, concurrency, total, items, mode, run_id):
+    latencies = []
+    errors = 0
+    received = 0
+    # Bytes en el cable (comprimidos, según el Accept-Encoding por defecto de httpx)
+    wire = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        async def one(index):
+            nonlocal errors, received, wire
+            producto = f"bench {run_id} {index}" if mode == "cold" else f"bench {run_id}"
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get("/scrape", params={"producto": producto, "max_items": items})
+                except httpx.HTTPError:
+                    errors += 1
+                    return
+                elapsed = time.perf_counter() - start
+            if response.status_code != 200:
+                errors += 1
+                return
+            latencies.append(elapsed)
+            received += len(response.content)
+            wire += response.num_bytes_downloaded
+
+        if mode == "warm":
+            await one(-1)
+            latencies.clear()
+            received = wire = 0
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(total)))
+        wall = time.perf_counter() - start
+
+    return {"mode": mode, "concurrency": concurrency, "requests": total, "items": items, "errors": errors,
+            "wall_s": wall, "rps": len(latencies) / wall if wall else None,
+            "bytes_per_response": received / len(latencies) if latencies else None,
+            "wire_bytes_per_response": wire / len(latencies) if latencies else None, **latency_summary(latencies)}
+
+
+def run(items=200, latency_ms=80.0, jitter_ms=20.0, concurrency=(1, 8, 32), requests_per_level=100,
+        modes=("cold", "warm")):
+    report = []
+    with StubServer(free_port(), items, latency_ms, jitter_ms) as stub:
+        with Backend(stub, UPSTREAM_RATE_PER_SECOND=1_000_000, UPSTREAM_BURST=1_000_000) as backend:
+            for mode in modes:
+                for level in concurrency:
+                    run_id = f"{mode}-{level}-{time.time_ns()}"
+                    report.append(asyncio.run(load(backend.url, level, requests_per_level, items, mode, run_id)))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y throughput de /scrape contra el stub")
+    parser.add_argument("--items", type=int, default=200, help="publicaciones por búsqueda")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="latencia del stub por página")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="requests por nivel de concurrencia")
+    parser.add_argument("--modes", nargs="+", choices=["cold", "warm"], default=["cold", "warm"])
+    parser.add_argument("--json", action="store_true", help="imprime el resultado como JSON")
+    args = parser.parse_args()
+
+    report = run(args.items, args.latency_ms, args.jitter_ms, args.concurrency, args.requests, args.modes)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'mode':>5} {'conc':>5} {'rps':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'errors':>7}")
+    for row in report:
+        print(f"{row['mode']:>5} {row['concurrency']:>5} {row['rps']:>8.1f} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
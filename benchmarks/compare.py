@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+# Compara dos reportes de benchmarks.run_all y marca las métricas que empeoraron más que el umbral.
+# Uso: python -m benchmarks.compare base.json nuevo.json [--threshold 10]; sale con código 1 si hay regresiones.
+
+# Clave que identifica cada fila de un benchmark y métricas a comparar (True: más alto es mejor)
+KEYS = {"prepare_data": ("listings",), "json": ("listings",), "scrape": ("mode", "concurrency"), "dashboard": ("items",)}
+METRICS = {
+    "prepare_data": {"columnar_s": False, "seller_s": False},
+    "json": {"encode_s": False, "decode_s": False},
+    "scrape": {"p50_ms": False, "p95_ms": False, "rps": True},
+    "dashboard": {"total_ms": False, "payload_bytes": False},
+}
+
+
+def compare(base, new, threshold):
+    rows = []
+    for bench, metrics in METRICS.items():
+        base_rows = {tuple(row[k] for k in KEYS[bench]): row for row in base["results"].get(bench, [])}
+        for row in new["results"].get(bench, []):
+            key = tuple(row[k] for k in KEYS[bench])
+            old = base_rows.get(key)
+            if old is None:
+                continue
+            for metric, higher_is_better in metrics.items():
+                before, after = old.get(metric), row.get(metric)
+                if not before or after is None:
+                    continue
+                change = (after - before) / before * 100
+                worse = -change if higher_is_better else change
+                rows.append({"bench": bench, "key": key, "metric": metric, "base": before, "new": after,
+                             "change_pct": change, "regression": worse > threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dos reportes de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="porcentaje tolerado antes de marcar regresión")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as file:
+        base = json.load(file)
+    with open(args.new, encoding="utf-8") as file:
+        new = json.load(file)
+
+    rows = compare(base, new, args.threshold)
+    print(f"{base['meta'].get('commit')} -> {new['meta'].get('commit')}")
+    for row in rows:
+        key = "/".join(str(part) for part in row["key"])
+        flag = "REGRESIÓN" if row["regression"] else ""
+        print(f"{row['bench']:>12} {key:>10} {row['metric']:>14} {row['base']:>12.4g} {row['new']:>12.4g} "
+              f"{row['change_pct']:>+8.1f}% {flag}")
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import random
+
+# Generador de publicaciones sintéticas con la forma de los resultados de sites/MLA/search
+
+BRANDS = ["Samsung", "Motorola", "Apple", "Xiaomi", "LG", "Noblex", "Philips", "Sony"]
+EXTRA_ATTRIBUTES = ["ITEM_CONDITION", "COLOR", "LINE", "WEIGHT", "GTIN", "PACKAGE_LENGTH", "PACKAGE_WIDTH",
+                    "PACKAGE_HEIGHT", "WARRANTY_TYPE", "WARRANTY_TIME", "VOLTAGE", "POWER", "MATERIAL",
+                    "IS_KIT", "MAIN_COLOR", "ORIGIN"]
+
+
+def make_listing(index, rng=random):
+    brand = rng.choice(BRANDS)
+    currency = "USD" if rng.random() < 0.15 else "ARS"
+    price = round(rng.uniform(20, 2000) if currency == "USD" else rng.uniform(5_000, 2_500_000), 2)
+    seller_id = rng.randint(1, max(2, index // 5 + 2))
+    attributes = [
+        {"id": "BRAND", "name": "Marca", "value_id": str(index), "value_name": brand},
+        {"id": "MODEL", "name": "Modelo", "value_id": None, "value_name": f"{brand[:3].upper()}-{index % 97}"},
+        {"id": "ALPHANUMERIC_MODEL", "name": "Modelo alfanumérico", "value_id": None,
+         "value_name": f"SKU{index:06d}"},
+    ] + [{"id": attr, "name": attr.title(), "value_id": None, "value_name": f"{attr.lower()}-{index % 13}"}
+         for attr in EXTRA_ATTRIBUTES]
+    rng.shuffle(attributes)
+    return {
+        "id": f"MLA{1_000_000_000 + index}",
+        "title": f"{brand} producto de prueba {index}",
+        "condition": "new" if rng.random() < 0.85 else "used",
+        "thumbnail": f"http://http2.mlstatic.com/D_{index}-I.jpg",
+        "permalink": f"https://articulo.mercadolibre.com.ar/MLA-{1_000_000_000 + index}-producto",
+        "domain_id": rng.choice(["MLA-CELLPHONES", "MLA-TELEVISIONS", "MLA-NOTEBOOKS", "MLA-HEADPHONES"]),
+        "listing_type_id": rng.choice(["gold_special", "gold_pro"]),
+        "catalog_listing": rng.random() < 0.3,
+        "price": price,
+        "original_price": None,
+        "currency_id": currency,
+        "available_quantity": rng.randint(1, 500),
+        "sold_quantity": rng.randint(0, 5000),
+        "accepts_mercadopago": True,
+        "last_updated": "2026-10-01T12:00:00.000Z",
+        "installments": {"quantity": 6, "amount": round(price / 6, 2), "rate": 0, "currency_id": currency},
+        "shipping": {"store_pick_up": False, "free_shipping": rng.random() < 0.6, "logistic_type": "fulfillment",
+                     "mode": "me2", "tags": ["fulfillment", "mandatory_free_shipping"] if rng.random() < 0.4 else []},
+        "seller": {"id": seller_id, "nickname": f"VENDEDOR_{seller_id}"},
+        "attributes": attributes,
+    }
+
+
+def make_listings(count, seed=0):
+    rng = random.Random(seed)
+    return [make_listing(index, rng) for index in range(count)]
+
+
+# Usuario con la forma de una entrada del multiget /users?ids=
+def make_user(seller_id):
+    rng = random.Random(seller_id)
+    return {"code": 200, "body": {
+        "id": seller_id,
+        "nickname": f"VENDEDOR_{seller_id}",
+        "address": {"city": rng.choice(["Palermo", "Rosario", "Córdoba", "La Plata"]),
+                    "state": rng.choice(["Capital Federal", "Santa Fe", "Córdoba", "Buenos Aires"])},
+        "permalink": f"http://perfil.mercadolibre.com.ar/VENDEDOR_{seller_id}",
+        "seller_reputation": {
+            "level_id": rng.choice(["5_green", "4_light_green", "3_yellow", None]),
+            "power_seller_status": rng.choice(["platinum", "gold", "silver", None]),
+            "transactions": {"completed": rng.randint(0, 50_000), "total": rng.randint(50_000, 60_000),
+                             "ratings": {"positive": round(rng.uniform(0.8, 1), 2)}},
+        },
+    }}
@@ -0,0 +1,113 @@
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import requests
+
+# Utilidades compartidas por los benchmarks: puertos libres, backend en un subproceso apuntado al stub,
+# percentiles y metadatos del reporte (commit, Python, fecha) para comparar corridas entre commits.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Entorno del backend para medir contra el stub: sin historial ni watchlist, con la caché configurable
+def backend_env(stub, **overrides):
+    env = dict(os.environ)
+    env.update({
+        "MELI_API_URL": stub.url,
+        "DOLLAR_API_URL": stub.dollar_url,
+        "HISTORY_ENABLED": "0",
+        "WATCHLIST_PATH": "",
+    })
+    env.update({key: str(value) for key, value in overrides.items()})
+    return env
+
+
+# Backend FastAPI (main:app) en un subproceso uvicorn: `with Backend(stub) as backend: backend.url`
+class Backend:
+    def __init__(self, stub, port=None, **env_overrides):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        # Cada backend arranca con su propia caché compartida vacía (las corridas "cold" no heredan entradas)
+        self.cache_dir = tempfile.mkdtemp(prefix="bench-cache-")
+        env_overrides.setdefault("SHARED_CACHE_PATH", os.path.join(self.cache_dir, "cache.sqlite3"))
+        self.env = backend_env(stub, **env_overrides)
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port),
+             "--log-level", "warning"],
+            cwd=ROOT, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                if requests.get(f"{self.url}/dolar/blue", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.process.kill()
+                raise RuntimeError("El backend no arrancó (¿puerto ocupado o dependencias faltantes?)")
+            time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        return False
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# Resumen de una lista de latencias en segundos, en milisegundos
+def latency_summary(latencies):
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    return {
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata():
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
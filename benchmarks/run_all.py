@@ -0,0 +1,43 @@
+import argparse
+import json
+import logging
+
+from benchmarks import bench_dashboard, bench_json, bench_prepare_data, bench_scrape
+from benchmarks.harness import metadata
+
+# Corre toda la suite y guarda un único reporte JSON (con commit, versión de Python y fecha) para
+# comparar entre commits con benchmarks.compare. Uso: python -m benchmarks.run_all --out bench.json [--quick]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite completa de benchmarks")
+    parser.add_argument("--out", help="archivo JSON de salida (por defecto, stdout)")
+    parser.add_argument("--quick", action="store_true", help="tamaños y cantidades reducidas")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    if args.quick:
+        results = {
+            "prepare_data": bench_prepare_data.run([50, 1_000, 10_000], repeat=3, legacy=False),
+            "json": bench_json.run([50, 1_000], repeat=3),
+            "scrape": bench_scrape.run(items=200, concurrency=(1, 8), requests_per_level=30),
+            "dashboard": bench_dashboard.run(sizes=(50, 200), repeat=2),
+        }
+    else:
+        results = {
+            "prepare_data": bench_prepare_data.run([50, 1_000, 10_000, 50_000], repeat=5, legacy=False),
+            "json": bench_json.run([50, 1_000, 10_000], repeat=5),
+            "scrape": bench_scrape.run(),
+            "dashboard": bench_dashboard.run(),
+        }
+
+    report = json.dumps({"meta": metadata(), "results": results}, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as file:
+            file.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+
+import uvicorn
+from fastapi import FastAPI, Response
+
+from benchmarks.fixtures import make_listings, make_user
+
+# Stub local de MercadoLibre (sites/MLA/search y los multiget /users e /items) y DólarAPI (v1/dolares/blue) para medir sin salir a internet.
+# Repite publicaciones sintéticas (benchmarks.fixtures) o un payload grabado de la API real, con una latencia
+# configurable por request. El backend se apunta al stub con MELI_API_URL y DOLLAR_API_URL.
+# Uso: python -m benchmarks.stub_server --port 9100 --items 1000 --latency-ms 80 [--payload busqueda.json]
+
+DOLLAR_PATH = "/v1/dolares/blue"
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Publicaciones de un payload grabado (respuesta de sites/MLA/search, lista de ítems o NDJSON), repetidas
+# hasta `count` con ids distintos para que el backend no las descarte como duplicadas
+def load_payload(path, count):
+    with open(path, encoding="utf-8") as file:
+        text = file.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    recorded = data.get("results", []) if isinstance(data, dict) else data
+    if not recorded:
+        raise ValueError(f"El payload {path} no tiene publicaciones")
+
+    listings = []
+    for index in range(count):
+        listing = dict(recorded[index % len(recorded)])
+        listing["id"] = f"{listing.get('id', 'MLA')}-{index}"
+        listings.append(listing)
+    return listings
+
+
+def create_app(listings, latency_ms=0.0, jitter_ms=0.0, dollar_rate=1200.0):
+    stub = FastAPI()
+    stub.state.requests = 0
+
+    async def delay():
+        stub.state.requests += 1
+        latency = latency_ms + random.uniform(0, jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+
+    # Las páginas se serializan una sola vez: el stub no debe ser el cuello de botella de la medición
+    pages = {}
+
+    @stub.get("/sites/MLA/search")
+    async def search(q: str = "", offset: int = 0, limit: int = 50):
+        await delay()
+        body = pages.get((offset, limit))
+        if body is None:
+            body = pages[offset, limit] = json.dumps({
+                "paging": {"total": len(listings), "offset": offset, "limit": limit},
+                "results": listings[offset:offset + limit]}, ensure_ascii=False).encode()
+        return Response(body, media_type="application/json")
+
+    @stub.get("/users")
+    async def users(ids: str = ""):
+        await delay()
+        return [make_user(int(seller_id)) for seller_id in ids.split(",") if seller_id.isdigit()]
+
+    by_id = {listing["id"]: listing for listing in listings}
+
+    @stub.get("/items")
+    async def items(ids: str = ""):
+        await delay()
+        entries = []
+        for item_id in ids.split(","):
+            listing = by_id.get(item_id)
+            if listing is None:
+                entries.append({"code": 404, "body": {"message": f"Item with id {item_id} not found"}})
+                continue
+            attributes = listing.get("attributes", []) + [{"id": "SELLER_SKU", "value_name": f"SKU-{item_id}"}]
+            entries.append({"code": 200, "body": {**listing, "attributes": attributes,
+                                                  "initial_quantity": listing.get("available_quantity")}})
+        return entries
+
+    @stub.get(DOLLAR_PATH)
+    async def dollar():
+        await delay()
+        return {"moneda": "USD", "casa": "blue", "compra": dollar_rate - 20, "venta": dollar_rate,
+                "fechaActualizacion": "2026-10-01T12:00:00.000Z"}
+
+    @stub.get("/stats")
+    async def stats():
+        return {"requests": stub.state.requests, "listings": len(listings)}
+
+    return stub
+
+
+# Stub en un subproceso (para que no compita por el GIL con el cliente que mide):
+# `with StubServer(port, items=1000, latency_ms=80) as stub: stub.url`
+class StubServer:
+    def __init__(self, port, items=1000, latency_ms=0.0, jitter_ms=0.0, payload=None):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        self.args = [sys.executable, "-m", "benchmarks.stub_server", "--port", str(port), "--items", str(items),
+                     "--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms)]
+        if payload:
+            self.args += ["--payload", payload]
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(self.args, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                with urllib.request.urlopen(f"{self.url}/stats", timeout=1):
+                    return self
+            except OSError:
+                pass
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.process.kill()
+                raise RuntimeError(f"El stub no arrancó en el puerto {self.port}")
+            time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+        return False
+
+    @property
+    def dollar_url(self):
+        return f"{self.url}{DOLLAR_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub local de MercadoLibre y DólarAPI")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--items", type=int, default=1000, help="publicaciones que devuelve cada búsqueda")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latencia fija por request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="latencia extra aleatoria (0..jitter)")
+    parser.add_argument("--payload", help="respuesta grabada de sites/MLA/search (JSON o NDJSON) a repetir")
+    args = parser.parse_args()
+
+    listings = load_payload(args.payload, args.items) if args.payload else make_listings(args.items)
+    uvicorn.run(create_app(listings, args.latency_ms, args.jitter_ms), host="127.0.0.1", port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
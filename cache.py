@@ -0,0 +1,422 @@
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import config
+import fastjson
+import metrics
+
+
+class CacheEntry:
+    __slots__ = ("value", "stored_at")
+
+    def __init__(self, value, stored_at=None):
+        self.value = value
+        self.stored_at = time.time() if stored_at is None else stored_at
+
+    @property
+    def age(self):
+        return time.time() - self.stored_at
+
+
+# Caché en memoria con expiración (TTL), tamaño acotado con desalojo LRU y modo
+# stale-while-revalidate: durante `stale_ttl` segundos después de vencer, la entrada
+# se sigue sirviendo mientras se refresca en segundo plano. Es segura entre hilos (Dash
+# ejecuta los callbacks en hilos del servidor Flask). Con `fallback_ttl` las entradas vencidas se
+# conservan un tiempo más, sólo para servirlas con fallback() cuando no se puede recalcular el valor.
+class TTLCache:
+    HIT = "HIT"
+    STALE = "STALE"
+    MISS = "MISS"
+    FALLBACK = "FALLBACK"
+
+    def __init__(self, maxsize, ttl, stale_ttl=0, fallback_ttl=0, name=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.fallback_ttl = fallback_ttl
+        self._entries = OrderedDict()
+        self._refreshing = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    # Con `name`, cada consulta suma a meli_cache_requests_total{cache=name,result=HIT|STALE|MISS|FALLBACK}
+    def _count(self, result):
+        if self.name:
+            metrics.cache_requests.inc(cache=self.name, result=result)
+
+    def lookup(self, key):
+        entry, state = self._lookup(key)
+        self._count(state)
+        return entry, state
+
+    # Antigüedad máxima con la que se conserva una entrada (vigencia + stale + fallback)
+    @property
+    def max_age(self):
+        return self.ttl + self.stale_ttl + self.fallback_ttl
+
+    def _state(self, age):
+        if age < self.ttl:
+            return self.HIT
+        if age < self.ttl + self.stale_ttl:
+            return self.STALE
+        return self.MISS
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, self.MISS
+
+            age = entry.age
+            state = self._state(age)
+            if state != self.MISS:
+                self._entries.move_to_end(key)
+                return entry, state
+
+            if age >= self.max_age:
+                del self._entries[key]
+            return None, self.MISS
+
+    # Última entrada conocida aunque esté vencida (dentro de fallback_ttl), o None
+    def fallback(self, key):
+        entry = self._fallback(key)
+        if entry is not None:
+            self._count(self.FALLBACK)
+        return entry
+
+    def _fallback(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.age >= self.max_age:
+                return None
+        return entry
+
+    def get(self, key, default=None):
+        entry, state = self.lookup(key)
+        return entry.value if state == self.HIT else default
+
+    # `stored_at` permite guardar una entrada con su fecha original (p. ej. al traerla del nivel compartido)
+    def set(self, key, value, stored_at=None):
+        entry = CacheEntry(value, stored_at)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # Versiones para el event loop; en la caché en memoria no hay I/O, así que son las mismas operaciones
+    async def alookup(self, key):
+        return self.lookup(key)
+
+    async def aget(self, key, default=None):
+        entry, state = await self.alookup(key)
+        return entry.value if state == self.HIT else default
+
+    async def afallback(self, key):
+        return self.fallback(key)
+
+    async def aset(self, key, value):
+        return self.set(key, value)
+
+    # {clave: valor} de las claves vigentes (HIT) entre `keys`
+    async def aget_many(self, keys):
+        found = {}
+        for key in dict.fromkeys(keys):
+            entry, state = self.lookup(key)
+            if state == self.HIT:
+                found[key] = entry.value
+        return found
+
+    async def aset_many(self, items):
+        for key, value in items.items():
+            self.set(key, value)
+
+    # Lanza (una sola vez por clave) una tarea que recalcula el valor con `loader` y lo guarda
+    def refresh_in_background(self, key, loader):
+        if key in self._refreshing:
+            return self._refreshing[key]
+
+        async def refresh():
+            try:
+                await self.aset(key, await loader())
+            except Exception as e:
+                logging.warning(f"No se pudo refrescar la entrada de caché {key!r}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        task = self._refreshing[key] = asyncio.create_task(refresh())
+        return task
+
+
+# Serialización compacta de los valores del nivel compartido: JSON (orjson si está) o pickle, comprimidos con zlib.
+# pickle es para valores que no son JSON (los DataFrames del dashboard); el archivo es local y lo escribe la app.
+CODECS = {
+    "json": (lambda value: zlib.compress(fastjson.dumps(value), 1),
+             lambda blob: fastjson.loads(zlib.decompress(blob))),
+    "pickle": (lambda value: zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL), 1),
+               lambda blob: pickle.loads(zlib.decompress(blob))),
+}
+
+# SQLite limita la cantidad de parámetros por sentencia
+_IN_CHUNK = 500
+
+SHARED_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+"""
+
+
+# Nivel compartido entre procesos: una base SQLite en modo WAL en el disco local, que leen y escriben todos los
+# workers (uvicorn, gunicorn) del host. Cada proceso abre su propia conexión (también después de un fork).
+# Las entradas se guardan con su fecha de escritura y cada caché aplica sus TTL al leerlas. Las lecturas y
+# escrituras son por lotes (una consulta / una transacción por lote) y bloquean: desde el event loop se llaman
+# en un hilo (TieredCache.alookup, aget_many, aset_many...).
+class SharedStore:
+    def __init__(self, path, prune_every=200):
+        self.path = path
+        self.prune_every = prune_every
+        self._conn = None
+        self._pid = None
+        self._unpruned = 0
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        if self._conn is None or self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=2, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SHARED_SCHEMA)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    # {clave: (valor serializado, stored_at)} de las claves con una entrada más nueva que max_age
+    def get_many(self, namespace, keys, max_age):
+        found = {}
+        cutoff = time.time() - max_age
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), _IN_CHUNK):
+                chunk = keys[start:start + _IN_CHUNK]
+                rows = conn.execute(
+                    f"SELECT key, value, stored_at FROM entries WHERE namespace = ? AND stored_at > ? "
+                    f"AND key IN ({','.join('?' * len(chunk))})", (namespace, cutoff, *chunk))
+                found.update((key, (value, stored_at)) for key, value, stored_at in rows)
+        return found
+
+    # Guarda [(clave, valor serializado, stored_at)] en una sola transacción
+    def put_many(self, namespace, items, max_age):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT OR REPLACE INTO entries (namespace, key, stored_at, value) VALUES (?, ?, ?, ?)",
+                                 [(namespace, key, stored_at, blob) for key, blob, stored_at in items])
+                self._unpruned += len(items)
+                # Cada tanto se borran las entradas que ya no sirven ni como fallback
+                if self._unpruned >= self.prune_every:
+                    conn.execute("DELETE FROM entries WHERE namespace = ? AND stored_at <= ?",
+                                 (namespace, time.time() - max_age))
+                    self._unpruned = 0
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._connection().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def clear(self, namespace):
+        with self._lock:
+            self._connection().execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+
+# Caché de dos niveles: la TTLCache del proceso delante de un SharedStore. Las escrituras van a ambos niveles;
+# si la entrada local falta o está vencida se consulta el nivel compartido, que puede tener una más nueva escrita
+# por otro worker, y se copia al proceso con su fecha original (mismas reglas de TTL/stale/fallback en los dos).
+# Los métodos sincrónicos (get, set, lookup...) hacen I/O en el hilo que llama y son para los callbacks de Dash;
+# desde el event loop se usan los async (alookup, aset, aget_many...), que llevan SQLite y la (de)serialización a
+# un hilo. Si SQLite falla, la caché sigue funcionando sólo con el nivel local.
+class TieredCache(TTLCache):
+    def __init__(self, maxsize, ttl, stale_ttl=0, fallback_ttl=0, name=None, store=None, serializer="json"):
+        super().__init__(maxsize, ttl, stale_ttl=stale_ttl, fallback_ttl=fallback_ttl, name=name)
+        self.store = store
+        self.namespace = name
+        self._encode, self._decode = CODECS[serializer]
+
+    # {clave: CacheEntry} de las claves que están en el nivel compartido
+    def _shared_get_many(self, keys):
+        try:
+            rows = self.store.get_many(self.namespace, [repr(key) for key in keys], self.max_age)
+            found = {key: CacheEntry(self._decode(rows[repr(key)][0]), rows[repr(key)][1])
+                     for key in keys if repr(key) in rows}
+        except Exception as e:
+            metrics.cache_shared_reads.inc(len(keys), cache=self.name, result="ERROR")
+            logging.warning(f"No se pudo leer la caché compartida {self.name!r}: {e!r}")
+            return {}
+        metrics.cache_shared_reads.inc(len(found), cache=self.name, result="HIT")
+        metrics.cache_shared_reads.inc(len(keys) - len(found), cache=self.name, result="MISS")
+        return found
+
+    def _shared_put_many(self, items):
+        try:
+            self.store.put_many(self.namespace, [(repr(key), self._encode(value), stored_at)
+                                                 for key, value, stored_at in items], self.max_age)
+        except Exception as e:
+            logging.warning(f"No se pudo escribir la caché compartida {self.name!r}: {e!r}")
+
+    # Combina la entrada local (y su estado) con la del nivel compartido, quedándose con la más nueva
+    def _merge(self, key, entry, state, shared):
+        if shared is None or (entry is not None and shared.stored_at <= entry.stored_at):
+            return entry, state
+        TTLCache.set(self, key, shared.value, shared.stored_at)
+        state = self._state(shared.age)
+        return (shared, state) if state != self.MISS else (None, state)
+
+    def _lookup(self, key):
+        entry, state = super()._lookup(key)
+        if state == self.HIT:
+            return entry, state
+        return self._merge(key, entry, state, self._shared_get_many([key]).get(key))
+
+    def _fallback(self, key):
+        entry = super()._fallback(key)
+        if entry is not None:
+            return entry
+        shared = self._shared_get_many([key]).get(key)
+        if shared is None or shared.age >= self.max_age:
+            return None
+        TTLCache.set(self, key, shared.value, shared.stored_at)
+        return shared
+
+    def set(self, key, value, stored_at=None):
+        entry = super().set(key, value, stored_at)
+        self._shared_put_many([(key, value, entry.stored_at)])
+        return entry
+
+    async def alookup(self, key):
+        entry, state = super()._lookup(key)
+        if state != self.HIT:
+            shared = await asyncio.to_thread(self._shared_get_many, [key])
+            entry, state = self._merge(key, entry, state, shared.get(key))
+        self._count(state)
+        return entry, state
+
+    async def afallback(self, key):
+        return await asyncio.to_thread(self.fallback, key)
+
+    async def aget_many(self, keys):
+        found = {}
+        pending = []
+        for key in dict.fromkeys(keys):
+            entry, state = super()._lookup(key)
+            if state == self.HIT:
+                found[key] = entry.value
+                self._count(state)
+            else:
+                pending.append((key, entry, state))
+        if pending:
+            shared = await asyncio.to_thread(self._shared_get_many, [key for key, _, _ in pending])
+            for key, entry, state in pending:
+                entry, state = self._merge(key, entry, state, shared.get(key))
+                if state == self.HIT:
+                    found[key] = entry.value
+                self._count(state)
+        return found
+
+    async def aset(self, key, value):
+        entry = TTLCache.set(self, key, value)
+        await asyncio.to_thread(self._shared_put_many, [(key, value, entry.stored_at)])
+        return entry
+
+    async def aset_many(self, items):
+        stored = [(key, value, TTLCache.set(self, key, value).stored_at) for key, value in items.items()]
+        if stored:
+            await asyncio.to_thread(self._shared_put_many, stored)
+
+    def delete(self, key):
+        super().delete(key)
+        try:
+            self.store.delete(self.namespace, repr(key))
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo borrar de la caché compartida {self.name!r}: {e!r}")
+
+    def clear(self):
+        super().clear()
+        try:
+            self.store.clear(self.namespace)
+        except sqlite3.Error as e:
+            logging.warning(f"No se pudo vaciar la caché compartida {self.name!r}: {e!r}")
+
+
+shared_store = SharedStore(config.SHARED_CACHE_PATH)
+
+
+# Crea una caché con nombre: de dos niveles si la caché compartida está habilitada, o sólo en memoria del proceso
+def make_cache(name, maxsize, ttl, stale_ttl=0, fallback_ttl=0, serializer="json"):
+    if config.SHARED_CACHE_ENABLED:
+        return TieredCache(maxsize, ttl, stale_ttl=stale_ttl, fallback_ttl=fallback_ttl, name=name,
+                           store=shared_store, serializer=serializer)
+    return TTLCache(maxsize, ttl, stale_ttl=stale_ttl, fallback_ttl=fallback_ttl, name=name)
+
+
+# Coalescing de requests ("single-flight"): las llamadas concurrentes con la misma clave
+# esperan una única ejecución en curso del loader y reciben todas su resultado.
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    # Tarea compartida para `key` (la lanza si no hay una en curso) y si la creó esta llamada: le sirve a quien
+    # además sigue el avance de la carga por otro canal, como el stream de páginas de /scrape/stream
+    def start(self, key, loader):
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task, False
+        self.executions += 1
+        task = self._inflight[key] = asyncio.create_task(loader())
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task, True
+
+    async def do(self, key, loader):
+        task, _ = self.start(key, loader)
+        # shield: si el request que espera se cancela, la llamada compartida sigue para los demás
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
@@ -0,0 +1,201 @@
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+import config
+import metrics
+
+# Compresión de respuestas (Brotli si está instalado el paquete brotli, si no gzip) para el backend FastAPI
+# (middleware ASGI) y el servidor Flask del dashboard (after_request). Sólo se comprimen tipos de texto/JSON de al
+# menos COMPRESSION_MIN_SIZE bytes; las respuestas en streaming (NDJSON, exportaciones) se comprimen por bloque con
+# flush, así el cliente sigue recibiendo cada bloque apenas se genera.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Codificaciones soportadas en orden de preferencia
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+# Header Accept-Encoding para los clientes propios (requests/urllib3 descomprimen br si está brotli)
+ACCEPT_ENCODING = ", ".join(ENCODINGS)
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript",
+                      "application/xml", "image/svg+xml")
+
+# Sin cuerpo o ya comprimido: nunca se comprime
+SKIP_STATUSES = (204, 304)
+
+
+# Mejor codificación aceptada por el cliente según Accept-Encoding (respetando q=0), o None
+def choose_encoding(accept_encoding):
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compressible(content_type):
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+# Compresor incremental: cada bloque sale con flush para que pueda decodificarse apenas llega
+class Compressor:
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.bytes_in = 0
+        self.bytes_out = 0
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=config.COMPRESSION_BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(config.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def _count(self, data, out):
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    def compress(self, data):
+        if self.encoding == "br":
+            return self._count(data, self._brotli.process(data) + self._brotli.flush())
+        return self._count(data, self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH))
+
+    def finish(self, data=b""):
+        if self.encoding == "br":
+            out = self._brotli.process(data) + self._brotli.finish()
+        else:
+            out = self._zlib.compress(data) + self._zlib.flush()
+        self._count(data, out)
+        metrics.compression_bytes.inc(self.bytes_in, encoding=self.encoding, direction="in")
+        metrics.compression_bytes.inc(self.bytes_out, encoding=self.encoding, direction="out")
+        return out
+
+
+def _vary(headers):
+    vary = headers.get("Vary")
+    if not vary:
+        headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+# Middleware ASGI del backend: app.add_middleware(compression.CompressionMiddleware)
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not config.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        await self.app(scope, receive, _Responder(send, encoding).send)
+
+
+class _Responder:
+    def __init__(self, send, encoding):
+        self._send = send
+        self.encoding = encoding
+        self.start = None
+        self.compressor = None
+        # None: todavía no se decidió; False: la respuesta pasa sin tocar
+        self.active = None
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            self.active = (message["status"] not in SKIP_STATUSES and "content-encoding" not in headers
+                           and compressible(headers.get("content-type")))
+            if self.active and self.encoding is None:
+                # El cliente no acepta compresión: sólo se avisa a las cachés intermedias que la respuesta varía
+                _vary(MutableHeaders(raw=message["headers"]))
+                self.active = False
+            if not self.active:
+                await self._send(message)
+            return
+        if message["type"] != "http.response.body" or not self.active:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start["headers"])
+            _vary(headers)
+            # Respuesta completa en un solo mensaje y chica: no vale la pena comprimirla
+            if not more_body and len(body) < config.COMPRESSION_MIN_SIZE:
+                self.active = False
+                await self._send(self.start)
+                await self._send(message)
+                return
+            self.compressor = Compressor(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            # El cuerpo comprimido ya no es idéntico byte a byte: el ETag fuerte pasa a débil (como hace nginx)
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send(self.start)
+
+        data = self.compressor.compress(body) if more_body else self.compressor.finish(body)
+        if data or not more_body:
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+
+def _iter_compressed(chunks, compressor):
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+# Comprime una respuesta de Flask según el Accept-Encoding del request en curso. Quedan afuera los archivos
+# servidos con send_file (direct_passthrough), que Flask entrega sin pasar por memoria.
+def compress_flask_response(response):
+    from flask import request
+
+    if (not config.COMPRESSION_ENABLED or response.status_code in SKIP_STATUSES or response.direct_passthrough
+            or "Content-Encoding" in response.headers or not compressible(response.content_type)):
+        return response
+    _vary(response.headers)
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _iter_compressed(response.iter_encoded(), Compressor(encoding))
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < config.COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(Compressor(encoding).finish(data))
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+# Registra la compresión en un servidor Flask. Flask ejecuta los after_request en orden inverso al de registro,
+# así que conviene instalarla antes que el resto para que sea la última en tocar la respuesta.
+def install_flask(server):
+    server.after_request(compress_flask_response)
@@ -0,0 +1,59 @@
+import hashlib
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request
+from starlette.responses import Response
+
+# GET condicional para las respuestas que salen de una caché: ETag, Last-Modified y Cache-Control a partir de la
+# entrada, y 304 Not Modified cuando el cliente ya tiene esa versión (If-None-Match, o If-Modified-Since si no
+# manda ETag). Así un cliente que vuelve a pedir lo mismo recibe sólo headers en lugar del payload completo.
+
+
+# ETag fuerte con el hash del contenido (mismo cuerpo, mismo ETag en cualquier worker)
+def content_etag(body):
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+# ETag débil a partir de partes que identifican la versión (cuando el cuerpo incluye datos que cambian solos,
+# como la antigüedad de la cotización)
+def version_etag(*parts):
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode("utf-8"), digest_size=16).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _opaque(etag):
+    return etag.strip().removeprefix("W/")
+
+
+# Comparación débil de If-None-Match (RFC 9110): da igual si alguno de los dos ETag es W/
+def etag_matches(if_none_match, etag):
+    if if_none_match.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(candidate) for candidate in if_none_match.split(",")}
+
+
+# Headers de validación y vigencia: `max_age` son los segundos que la entrada sigue fresca en la caché
+def validators(etag, last_modified, max_age):
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        "Cache-Control": f"max-age={max(0, int(max_age))}",
+    }
+
+
+def not_modified(request: Request, etag, last_modified):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# 304 con los mismos headers de validación (y los extra, p. ej. X-Cache) que tendría la respuesta completa
+def not_modified_response(headers):
+    return Response(status_code=304, headers=headers)
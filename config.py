@@ -0,0 +1,106 @@
+import os
+
+
+# Configuración del backend; todos los valores se pueden sobreescribir con variables de entorno
+def _env_float(name, default):
+    return float(os.getenv(name, default))
+
+
+def _env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+# URLs de los servicios externos
+MELI_API_URL = os.getenv("MELI_API_URL", "https://api.mercadolibre.com")
+DOLLAR_API_URL = os.getenv("DOLLAR_API_URL", "https://dolarapi.com/v1/dolares/blue")
+
+# Pool de conexiones del cliente HTTP compartido
+HTTP_MAX_CONNECTIONS = _env_int("HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = _env_int("HTTP_MAX_KEEPALIVE", 20)
+HTTP_KEEPALIVE_EXPIRY = _env_float("HTTP_KEEPALIVE_EXPIRY", 30)
+HTTP_MAX_PER_HOST = _env_int("HTTP_MAX_PER_HOST", 20)
+
+# Timeouts (en segundos) para las llamadas a los upstreams
+HTTP_CONNECT_TIMEOUT = _env_float("HTTP_CONNECT_TIMEOUT", 5)
+HTTP_READ_TIMEOUT = _env_float("HTTP_READ_TIMEOUT", 15)
+HTTP_POOL_TIMEOUT = _env_float("HTTP_POOL_TIMEOUT", 10)
+
+# Política de upstream por host: requests por segundo y ráfaga del token bucket, intentos por llamada,
+# base y tope (s) del backoff exponencial, fallas seguidas que abren el circuito y segundos que queda abierto
+UPSTREAM_RATE_PER_SECOND = _env_float("UPSTREAM_RATE_PER_SECOND", 10)
+UPSTREAM_BURST = _env_int("UPSTREAM_BURST", 20)
+UPSTREAM_RETRY_ATTEMPTS = _env_int("UPSTREAM_RETRY_ATTEMPTS", 3)
+UPSTREAM_RETRY_BASE = _env_float("UPSTREAM_RETRY_BASE", 0.5)
+UPSTREAM_RETRY_MAX_WAIT = _env_float("UPSTREAM_RETRY_MAX_WAIT", 10)
+UPSTREAM_BREAKER_THRESHOLD = _env_int("UPSTREAM_BREAKER_THRESHOLD", 5)
+UPSTREAM_BREAKER_RESET = _env_float("UPSTREAM_BREAKER_RESET", 30)
+
+# Búsqueda multi-página en MercadoLibre
+MELI_MAX_RESULTS = _env_int("MELI_MAX_RESULTS", 1000)
+MELI_PAGE_CONCURRENCY = _env_int("MELI_PAGE_CONCURRENCY", 8)
+# Directorio de vendedores (multiget /users): TTL (s) y tamaño de la caché, ids por request y requests simultáneos,
+# y máximo de ids que acepta POST /sellers
+SELLER_CACHE_TTL = _env_float("SELLER_CACHE_TTL", 86400)
+SELLER_CACHE_SIZE = _env_int("SELLER_CACHE_SIZE", 20000)
+SELLER_BATCH_SIZE = _env_int("SELLER_BATCH_SIZE", 20)
+SELLER_CONCURRENCY = _env_int("SELLER_CONCURRENCY", 4)
+SELLER_MAX_IDS = _env_int("SELLER_MAX_IDS", 1000)
+# Detalle de publicaciones (multiget /items, details=true): TTL (s) y tamaño de la caché, requests simultáneos
+ITEM_CACHE_TTL = _env_float("ITEM_CACHE_TTL", 3600)
+ITEM_CACHE_SIZE = _env_int("ITEM_CACHE_SIZE", 50000)
+ITEM_CONCURRENCY = _env_int("ITEM_CONCURRENCY", 4)
+# /scrape/batch: búsquedas simultáneas por lote y máximo de búsquedas por request
+BATCH_CONCURRENCY = _env_int("BATCH_CONCURRENCY", 8)
+BATCH_MAX_QUERIES = _env_int("BATCH_MAX_QUERIES", 500)
+
+# Caché compartida entre los procesos del host (workers de uvicorn/gunicorn y el dashboard): SQLite en modo WAL
+# detrás de la caché en memoria de cada proceso. Con 0 cada proceso usa sólo su caché en memoria.
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+SHARED_CACHE_PATH = os.getenv("SHARED_CACHE_PATH", os.path.join("data", "cache.sqlite3"))
+
+# Caché de resultados de búsqueda: vigencia (s), ventana stale-while-revalidate (s) y cantidad de entradas
+SEARCH_CACHE_TTL = _env_float("SEARCH_CACHE_TTL", 300)
+SEARCH_CACHE_STALE_TTL = _env_float("SEARCH_CACHE_STALE_TTL", 600)
+SEARCH_CACHE_SIZE = _env_int("SEARCH_CACHE_SIZE", 256)
+# Mientras MercadoLibre no responde, se sirven resultados vencidos de hasta esta antigüedad (s)
+SEARCH_CACHE_FALLBACK_TTL = _env_float("SEARCH_CACHE_FALLBACK_TTL", 86400)
+
+# Refresco en segundo plano de la cotización del dólar blue (intervalo normal y backoff ante errores, en segundos)
+DOLLAR_REFRESH_INTERVAL = _env_float("DOLLAR_REFRESH_INTERVAL", 3600)
+DOLLAR_RETRY_BASE = _env_float("DOLLAR_RETRY_BASE", 5)
+DOLLAR_RETRY_MAX = _env_float("DOLLAR_RETRY_MAX", 300)
+
+# Compresión de respuestas (backend y dashboard): tamaño mínimo (bytes) para comprimir y niveles de gzip (1-9)
+# y Brotli (0-11); Brotli se usa sólo si está instalado el paquete brotli
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes")
+COMPRESSION_MIN_SIZE = _env_int("COMPRESSION_MIN_SIZE", 1024)
+COMPRESSION_GZIP_LEVEL = _env_int("COMPRESSION_GZIP_LEVEL", 6)
+COMPRESSION_BROTLI_QUALITY = _env_int("COMPRESSION_BROTLI_QUALITY", 4)
+
+# Dashboard (app.py): URL del backend FastAPI, ítems por búsqueda, si se pide el detalle de cada publicación
+# (details=true), filas por página de la tabla, filas por bloque al exportar y caché de búsquedas procesadas
+BACKEND_URL = os.getenv("BACKEND_URL", "http://127.0.0.1:8000")
+DASH_MAX_ITEMS = _env_int("DASH_MAX_ITEMS", 50)
+DASH_ITEM_DETAILS = os.getenv("DASH_ITEM_DETAILS", "0").lower() in ("1", "true", "yes")
+DASH_PAGE_SIZE = _env_int("DASH_PAGE_SIZE", 10)
+EXPORT_CHUNK_ROWS = _env_int("EXPORT_CHUNK_ROWS", 1000)
+DASH_SEARCH_CACHE_TTL = _env_float("DASH_SEARCH_CACHE_TTL", 1800)
+DASH_SEARCH_CACHE_SIZE = _env_int("DASH_SEARCH_CACHE_SIZE", 32)
+
+# Captura de payloads para depuración (apagada por defecto): fracción muestreada, tamaño máximo y entradas guardadas
+LOG_CAPTURE_PAYLOADS = os.getenv("LOG_CAPTURE_PAYLOADS", "0").lower() in ("1", "true", "yes")
+LOG_CAPTURE_SAMPLE_RATE = _env_float("LOG_CAPTURE_SAMPLE_RATE", 0.1)
+LOG_CAPTURE_MAX_BYTES = _env_int("LOG_CAPTURE_MAX_BYTES", 16384)
+LOG_CAPTURE_BUFFER = _env_int("LOG_CAPTURE_BUFFER", 200)
+
+# Historial de precios en SQLite (cada búsqueda nueva se guarda como snapshot)
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "1").lower() in ("1", "true", "yes")
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join("data", "history.sqlite3"))
+
+# Watchlist: archivo JSON con búsquedas a refrescar periódicamente, intervalo por defecto y mínimo (s),
+# presupuesto global de páginas por minuto hacia MercadoLibre y refrescos simultáneos
+WATCHLIST_PATH = os.getenv("WATCHLIST_PATH", "watchlist.json")
+WATCHLIST_DEFAULT_INTERVAL = _env_float("WATCHLIST_DEFAULT_INTERVAL", 900)
+WATCHLIST_MIN_INTERVAL = _env_float("WATCHLIST_MIN_INTERVAL", 60)
+WATCHLIST_BUDGET_PER_MINUTE = _env_int("WATCHLIST_BUDGET_PER_MINUTE", 60)
+WATCHLIST_CONCURRENCY = _env_int("WATCHLIST_CONCURRENCY", 2)
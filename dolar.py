@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+
+import cache
+import config
+import fastjson
+import http_client
+
+
+# Cotización del dólar blue mantenida en memoria por una tarea de fondo.
+# Los lectores nunca hacen I/O: leen el último valor bueno conocido y su antigüedad.
+# Con `shared` (una caché compartida entre procesos), cada worker adopta la cotización que otro haya obtenido
+# dentro del intervalo en lugar de volver a pedirla.
+class DollarRateService:
+    SHARED_KEY = "blue"
+
+    def __init__(self, url, interval, retry_base, retry_max, shared=None):
+        self.url = url
+        self.shared = shared
+        self.interval = interval
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.value = None
+        self.updated_at = None
+        self.last_error = None
+        self.failures = 0
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    async def _fetch(self):
+        response = await http_client.get(self.url)
+        response.raise_for_status()
+        data = fastjson.loads(response.content)
+        return float(data["venta"])
+
+    # Toma la cotización de la caché compartida si es más nueva que la propia
+    async def _adopt_shared(self):
+        if self.shared is None:
+            return False
+        rate = await self.shared.aget(self.SHARED_KEY)
+        if rate is None or (self.updated_at is not None and rate["updated_at"] <= self.updated_at):
+            return False
+        self.value = rate["value"]
+        self.updated_at = rate["updated_at"]
+        self.failures = 0
+        self.last_error = None
+        logging.info(f"Dólar Blue tomado de la caché compartida: {self.value}")
+        return True
+
+    # Refresca la cotización (con force=True sin mirar la caché compartida); ante un error se conserva
+    # el último valor bueno
+    async def refresh(self, force=False):
+        async with self._lock:
+            if not force and await self._adopt_shared():
+                return True
+            try:
+                value = await self._fetch()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                logging.error(f"Error al obtener el valor del dólar blue: {self.last_error}")
+                return False
+
+            self.value = value
+            self.updated_at = time.time()
+            self.failures = 0
+            self.last_error = None
+            if self.shared is not None:
+                await self.shared.aset(self.SHARED_KEY, {"value": value, "updated_at": self.updated_at})
+            logging.info(f"Dólar Blue actualizado: {value}")
+            return True
+
+    # Espera antes del próximo intento: el intervalo normal, o backoff exponencial con jitter tras un error
+    def _next_delay(self):
+        if self.failures == 0:
+            return self.interval
+        delay = min(self.retry_max, self.retry_base * 2 ** (self.failures - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _run(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self._next_delay())
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def age(self):
+        return None if self.updated_at is None else time.time() - self.updated_at
+
+    def snapshot(self):
+        age = self.age
+        return {
+            "dollar_blue_sale_value": self.value,
+            "updated_at": None if self.updated_at is None else
+            datetime.fromtimestamp(self.updated_at, timezone.utc).isoformat(),
+            "age_seconds": None if age is None else round(age, 1),
+            "stale": age is None or age > 2 * self.interval,
+            "last_error": self.last_error,
+        }
+
+
+dollar_blue = DollarRateService(config.DOLLAR_API_URL, interval=config.DOLLAR_REFRESH_INTERVAL,
+                                retry_base=config.DOLLAR_RETRY_BASE, retry_max=config.DOLLAR_RETRY_MAX,
+                                shared=cache.make_cache("dolar", maxsize=1, ttl=config.DOLLAR_REFRESH_INTERVAL))
@@ -0,0 +1,125 @@
+import importlib.util
+import os
+import tempfile
+
+import config
+
+# Exportación de un DataFrame en streaming: cada función devuelve un iterable que entrega el archivo por partes,
+# de modo que ni el CSV/NDJSON ni el XLSX/Parquet completos se arman en memoria.
+
+FORMATS = {
+    # Flask agrega el charset a los mimetypes de texto
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "xlsx": ("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", "xlsx"),
+}
+
+# pyarrow es opcional: sin él el dashboard no ofrece la exportación a Parquet
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Tamaño de los bloques en los que se lee un archivo temporal para enviarlo
+READ_BLOCK = 64 * 1024
+
+
+class ExportError(Exception):
+    pass
+
+
+def _chunks(df, rows=None):
+    rows = rows or config.EXPORT_CHUNK_ROWS
+    for start in range(0, len(df), rows):
+        yield df.iloc[start:start + rows]
+
+
+def iter_csv(df):
+    # BOM para que Excel abra el CSV como UTF-8
+    yield "\ufeff"
+    for index, chunk in enumerate(_chunks(df)):
+        yield chunk.to_csv(index=False, header=index == 0)
+    if df.empty:
+        yield df.to_csv(index=False)
+
+
+def iter_ndjson(df):
+    for chunk in _chunks(df):
+        yield chunk.to_json(orient="records", lines=True, force_ascii=False)
+
+
+# Contenido de un archivo temporal por bloques. El archivo se borra al terminar de leerlo o en close(), que el
+# servidor WSGI llama al cerrar la respuesta aunque no se haya leído (HEAD, descarga cortada)
+class TempFileBody:
+    def __init__(self, path):
+        self.path = path
+
+    def __iter__(self):
+        with open(self.path, "rb") as file:
+            while block := file.read(READ_BLOCK):
+                yield block
+        self.close()
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _temp_path(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    return path
+
+
+# XLSX con xlsxwriter en modo constant_memory: las filas se escriben en orden y se vuelcan a disco
+# a medida que se completan, así que la memoria no crece con la cantidad de filas
+def iter_xlsx(df, sheet_name="Resultados"):
+    try:
+        import xlsxwriter
+    except ImportError as e:
+        raise ExportError("La exportación a XLSX requiere el paquete XlsxWriter") from e
+
+    path = _temp_path(".xlsx")
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "nan_inf_to_errors": True})
+    try:
+        worksheet = workbook.add_worksheet(sheet_name)
+        worksheet.write_row(0, 0, [str(column) for column in df.columns])
+        row_index = 1
+        for chunk in _chunks(df):
+            for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+                worksheet.write_row(row_index, 0, row)
+                row_index += 1
+    finally:
+        workbook.close()
+    return TempFileBody(path)
+
+
+# Parquet escrito por row groups (uno por bloque de filas); pyarrow es una dependencia opcional
+def iter_parquet(df):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ExportError("La exportación a Parquet requiere el paquete pyarrow") from e
+
+    # Las columnas de texto (o con tipos mezclados, p. ej. "No disponible" junto a números) se exportan como string
+    df = df.astype({column: "string" for column in df.columns if df[column].dtype == object})
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+
+    path = _temp_path(".parquet")
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    return TempFileBody(path)
+
+
+WRITERS = {"csv": iter_csv, "ndjson": iter_ndjson, "parquet": iter_parquet, "xlsx": iter_xlsx}
+
+
+# Devuelve (iterable, mimetype, nombre de archivo) para exportar `df` en el formato pedido
+def export_frame(df, fmt, basename="resultados_scraping"):
+    if fmt not in FORMATS:
+        raise ExportError(f"Formato de exportación no soportado: {fmt}")
+    mimetype, extension = FORMATS[fmt]
+    return WRITERS[fmt](df), mimetype, f"{basename}.{extension}"
+
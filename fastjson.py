@@ -0,0 +1,36 @@
+import json
+
+from starlette.responses import JSONResponse as _JSONResponse
+
+# Capa de JSON rápido: usa orjson si está instalado y, si no, la librería estándar con el mismo resultado
+# (UTF-8 sin escapar, sin espacios). La usan el parseo de las respuestas de MercadoLibre, las respuestas del
+# backend (JSONResponse, NDJSON) y la lectura del backend desde el dashboard.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENGINE = "orjson" if orjson else "json"
+
+
+def loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+# Serializa a bytes
+def dumps(obj):
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# Una línea de NDJSON (con el salto de línea final)
+def dumps_line(obj):
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+    return dumps(obj) + b"\n"
+
+
+class JSONResponse(_JSONResponse):
+    def render(self, content):
+        return dumps(content)
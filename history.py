@@ -0,0 +1,176 @@
+import logging
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from datetime import datetime, timezone
+
+import config
+from log_utils import log_stage
+
+# Historial de precios: cada resultado de /scrape se guarda como un snapshot con fecha en SQLite.
+# Un ítem sólo genera una fila nueva si cambió su precio o stock, o si todavía no tiene snapshot en el día,
+# de modo que las series diarias quedan completas sin repetir filas idénticas.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    query TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    seller_id INTEGER,
+    title TEXT,
+    price REAL,
+    currency TEXT,
+    price_ars REAL,
+    available_quantity INTEGER,
+    sold_quantity INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_item ON snapshots (item_id, day);
+CREATE INDEX IF NOT EXISTS idx_snapshots_query ON snapshots (query, day);
+CREATE INDEX IF NOT EXISTS idx_snapshots_seller ON snapshots (seller_id, day);
+
+-- Último estado conocido de cada ítem por búsqueda, para descartar snapshots sin cambios
+CREATE TABLE IF NOT EXISTS latest (
+    query TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    price REAL,
+    currency TEXT,
+    available_quantity INTEGER,
+    PRIMARY KEY (query, item_id)
+);
+"""
+
+# SQLite limita la cantidad de parámetros por sentencia
+_IN_CHUNK = 500
+
+# Columnas por las que se pueden pedir series diarias
+SERIES_COLUMNS = ("query", "item_id", "seller_id")
+
+
+def _day(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def open(self):
+        if self._conn is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _latest_states(self, query, item_ids):
+        states = {}
+        for start in range(0, len(item_ids), _IN_CHUNK):
+            chunk = item_ids[start:start + _IN_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT item_id, day, price, currency, available_quantity FROM latest "
+                f"WHERE query = ? AND item_id IN ({','.join('?' * len(chunk))})", [query, *chunk])
+            states.update((row[0], row[1:]) for row in rows)
+        return states
+
+    # Guarda en una sola transacción los ítems de una búsqueda; devuelve cuántos snapshots se insertaron
+    def ingest(self, query, items, dollar_rate=None, ts=None):
+        ts = time.time() if ts is None else ts
+        day = _day(ts)
+        items = {item["id"]: item for item in items if isinstance(item, dict) and item.get("id")}
+        if not items:
+            return 0
+
+        with self._lock:
+            if self._conn is None:
+                return 0
+            latest = self._latest_states(query, list(items))
+            snapshots = []
+            for item_id, item in items.items():
+                price = item.get("price")
+                currency = item.get("currency_id")
+                stock = item.get("available_quantity")
+                if latest.get(item_id) == (day, price, currency, stock):
+                    continue
+                price_ars = price
+                if currency == "USD":
+                    price_ars = price * dollar_rate if price is not None and dollar_rate else None
+                seller = item.get("seller") if isinstance(item.get("seller"), dict) else {}
+                snapshots.append((ts, day, query, item_id, seller.get("id"), item.get("title"), price, currency,
+                                  price_ars, stock, item.get("sold_quantity")))
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO snapshots (ts, day, query, item_id, seller_id, title, price, currency, price_ars, "
+                    "available_quantity, sold_quantity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", snapshots)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO latest (query, item_id, day, price, currency, available_quantity) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", [(s[2], s[3], s[1], s[6], s[7], s[9]) for s in snapshots])
+        return len(snapshots)
+
+    # Serie diaria (mínimo, mediana, máximo y cantidad de publicaciones) del precio en ARS
+    def daily_prices(self, column, value, days=30):
+        if column not in SERIES_COLUMNS:
+            raise ValueError(f"Columna no soportada para series: {column}")
+        since = _day(time.time() - days * 86400)
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute(
+                f"SELECT day, item_id, price_ars FROM snapshots WHERE {column} = ? AND day >= ? "
+                f"AND price_ars IS NOT NULL ORDER BY day, item_id, ts", (value, since)).fetchall()
+
+        # Por día se toma el último precio de cada ítem
+        by_day = {}
+        for day, item_id, price in rows:
+            by_day.setdefault(day, {})[item_id] = price
+        series = []
+        for day, items in by_day.items():
+            prices = list(items.values())
+            series.append({"day": day, "min": min(prices), "median": statistics.median(prices),
+                           "max": max(prices), "items": len(prices)})
+        return series
+
+    def item_snapshots(self, item_id, limit=500):
+        with self._lock:
+            if self._conn is None:
+                return []
+            rows = self._conn.execute(
+                "SELECT ts, query, price, currency, price_ars, available_quantity, sold_quantity FROM snapshots "
+                "WHERE item_id = ? ORDER BY ts DESC LIMIT ?", (item_id, limit)).fetchall()
+        return [
+            {"ts": datetime.fromtimestamp(ts, timezone.utc).isoformat(), "query": query, "price": price,
+             "currency": currency, "price_ars": price_ars, "available_quantity": stock, "sold_quantity": sold}
+            for ts, query, price, currency, price_ars, stock, sold in rows
+        ]
+
+
+store = HistoryStore(config.HISTORY_DB_PATH)
+
+
+# Ingesta para correr en un hilo desde el backend: los errores de la base se registran y no cortan la búsqueda
+def safe_ingest(query, items, dollar_rate=None):
+    start = time.perf_counter()
+    try:
+        inserted = store.ingest(query, items, dollar_rate)
+    except sqlite3.Error as e:
+        logging.error(f"Error al guardar el historial de {query!r}: {e}")
+        return 0
+    log_stage("history.ingest", q=query, items=len(items), inserted=inserted,
+              ms=(time.perf_counter() - start) * 1000)
+    return inserted
@@ -0,0 +1,68 @@
+import asyncio
+from urllib.parse import urlsplit
+
+import httpx
+
+import config
+import upstream
+
+# Cliente HTTP asíncrono compartido por todo el backend. Se crea en el startup de FastAPI
+# y se cierra en el shutdown, de modo que las conexiones keep-alive se reutilizan entre requests.
+_client = None
+
+# Semáforos por host: httpx limita el pool completo, pero no cuántas conexiones abre contra cada host
+_host_limits = {}
+
+
+def _build_client():
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        connect=config.HTTP_CONNECT_TIMEOUT,
+        read=config.HTTP_READ_TIMEOUT,
+        write=config.HTTP_READ_TIMEOUT,
+        pool=config.HTTP_POOL_TIMEOUT,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout, headers={"Accept": "application/json"})
+
+
+async def startup():
+    global _client
+    if _client is None:
+        _client = _build_client()
+
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _host_limits.clear()
+    upstream.reset()
+
+
+def get_client():
+    if _client is None:
+        raise RuntimeError("El cliente HTTP no fue inicializado (falta el evento de startup)")
+    return _client
+
+
+def _host_semaphore(url):
+    host = urlsplit(url).netloc
+    semaphore = _host_limits.get(host)
+    if semaphore is None:
+        semaphore = _host_limits[host] = asyncio.Semaphore(config.HTTP_MAX_PER_HOST)
+    return semaphore
+
+
+# GET contra un upstream respetando el límite de conexiones por host y la política de upstream
+# (rate limit, reintentos y circuit breaker, ver upstream.py)
+async def get(url, params=None):
+    async def send():
+        async with _host_semaphore(url):
+            return await get_client().get(url, params=params)
+
+    return await upstream.policy_for(url).call(send)
@@ -0,0 +1,58 @@
+import cache
+import config
+import multiget
+
+# Detalle de publicaciones (cantidad vendida, stock, SKU y atributos completos), que el buscador trae
+# incompletos. Se resuelve con el multiget /items?ids= (hasta 20 ids por request) en lotes concurrentes y
+# se cachea con TTL; un detalle cacheado se reutiliza mientras el last_updated del resultado de búsqueda
+# no cambie.
+
+ITEMS_URL = f"{config.MELI_API_URL}/items"
+
+# Máximo de ids que acepta el multiget de MercadoLibre
+MAX_IDS = 20
+
+# Campos del detalle que se piden (attributes=) y se copian sobre el resultado de búsqueda
+DETAIL_FIELDS = ("id", "last_updated", "sold_quantity", "available_quantity", "initial_quantity",
+                 "seller_custom_field", "attributes")
+
+details = cache.make_cache("items", maxsize=config.ITEM_CACHE_SIZE, ttl=config.ITEM_CACHE_TTL)
+
+
+async def fetch_items(ids):
+    found = await multiget.fetch(ITEMS_URL, ids, "meli.items", attributes=",".join(DETAIL_FIELDS))
+    return {item_id: {field: body[field] for field in DETAIL_FIELDS if field in body}
+            for item_id, body in found.items()}
+
+
+# Un detalle cacheado (dentro del TTL) sigue vigente mientras tenga el mismo last_updated que el resultado
+def _is_current(product, detail):
+    last_updated = product.get("last_updated")
+    return not (last_updated and detail.get("last_updated") and last_updated != detail["last_updated"])
+
+
+# Devuelve los productos con los campos del detalle copiados encima (sin modificar los originales).
+# Los ítems cuyo detalle no se pudo obtener quedan como vinieron del buscador.
+async def enrich(products):
+    cached = await details.aget_many(product["id"] for product in products
+                                     if isinstance(product, dict) and product.get("id"))
+    resolved = {}
+    missing = []
+    for product in products:
+        item_id = product.get("id") if isinstance(product, dict) else None
+        if not item_id or item_id in resolved:
+            continue
+        detail = cached.get(item_id)
+        if detail is None or not _is_current(product, detail):
+            missing.append(item_id)
+            resolved[item_id] = None
+        else:
+            resolved[item_id] = detail
+
+    if missing:
+        fetched = await multiget.fetch_all(missing, fetch_items, MAX_IDS, config.ITEM_CONCURRENCY, "publicaciones")
+        await details.aset_many(fetched)
+        resolved.update(fetched)
+
+    return [{**product, **resolved[product["id"]]} if isinstance(product, dict) and resolved.get(product.get("id"))
+            else product for product in products]
@@ -0,0 +1,141 @@
+import contextvars
+import json
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import config
+import metrics
+
+# Logger de las líneas de resumen por etapa (una línea "stage=... clave=valor" por etapa del hot path)
+logger = logging.getLogger("meli.stages")
+
+# Tiempos (etapa, ms) del request en curso, para el header Server-Timing; None fuera de un request
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+# Formatea los campos como clave=valor recién cuando el handler escribe la línea (formateo perezoso)
+class _Fields:
+    __slots__ = ("fields",)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __str__(self):
+        return " ".join(f"{key}={value:.1f}" if isinstance(value, float) else f"{key}={value}"
+                        for key, value in self.fields.items())
+
+
+# Registra la duración de una etapa en las métricas (/metrics) y en los tiempos del request en curso
+def observe_stage(stage, ms, error=None, size=None):
+    metrics.stage_seconds.observe(ms / 1000, stage=stage)
+    if error:
+        metrics.stage_errors.inc(stage=stage, error=error)
+    if isinstance(size, int):
+        metrics.stage_payload_bytes.observe(size, stage=stage)
+        metrics.stage_last_payload_bytes.set(size, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, ms))
+
+
+# Las líneas que informan "ms" también alimentan las métricas, aunque el nivel de log las descarte
+def log_stage(stage, level=logging.INFO, **fields):
+    if "ms" in fields:
+        observe_stage(stage, fields["ms"], fields.get("error"), fields.get("bytes"))
+    if logger.isEnabledFor(level):
+        logger.log(level, "stage=%s %s", stage, _Fields(fields))
+
+
+# Mide una etapa y escribe su línea de resumen al terminar, con el tiempo en ms.
+# Los campos se pueden completar dentro del bloque: `with timed_stage("x") as fields: fields["items"] = n`
+class timed_stage:
+    def __init__(self, stage, **fields):
+        self.stage = stage
+        self.fields = fields
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.fields
+
+    def __exit__(self, exc_type, exc, tb):
+        self.fields["ms"] = (time.perf_counter() - self.start) * 1000
+        if exc_type is not None:
+            self.fields["error"] = exc_type.__name__
+        log_stage(self.stage, logging.WARNING if exc_type else logging.INFO, **self.fields)
+        return False
+
+
+# Como timed_stage pero sin línea de log: para sub-etapas que sólo interesan en métricas y Server-Timing
+class measure_stage:
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe_stage(self.stage, (time.perf_counter() - self.start) * 1000,
+                      exc_type.__name__ if exc_type else None)
+        return False
+
+
+# Server-Timing: start_request_timings() al empezar el request; al terminar, finish_request_timings(token)
+# devuelve las etapas medidas (incluidas las de tareas lanzadas desde el request) y server_timing_header las
+# agrupa por etapa, p. ej. "meli.page;dur=812.4;desc=\"4x\", total;dur=905.1"
+def start_request_timings():
+    return _request_timings.set([])
+
+
+def finish_request_timings(token):
+    timings = _request_timings.get() or []
+    _request_timings.reset(token)
+    return timings
+
+
+def server_timing_header(timings, total_ms=None):
+    grouped = {}
+    for stage, ms in timings:
+        total, count = grouped.get(stage, (0.0, 0))
+        grouped[stage] = (total + ms, count + 1)
+    parts = [f'{stage};dur={ms:.1f}' + (f';desc="{count}x"' if count > 1 else "")
+             for stage, (ms, count) in grouped.items()]
+    if total_ms is not None:
+        parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+# Captura opcional de payloads para depurar: muestreada, con tamaño máximo y guardada en un
+# buffer circular en memoria (se consulta desde /debug/payloads en lugar de ir a stdout).
+class PayloadRecorder:
+    def __init__(self, enabled, sample_rate, max_bytes, capacity):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self._buffer = deque(maxlen=capacity)
+
+    def capture(self, stage, payload):
+        if not self.enabled or random.random() >= self.sample_rate:
+            return
+        text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+        self._buffer.append({
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "stage": stage,
+            "size": len(text),
+            "truncated": len(text) > self.max_bytes,
+            "payload": text[:self.max_bytes],
+        })
+
+    def entries(self, stage=None, limit=None):
+        entries = [entry for entry in self._buffer if stage is None or entry["stage"] == stage]
+        return entries[-limit:] if limit else entries
+
+    def clear(self):
+        self._buffer.clear()
+
+
+payloads = PayloadRecorder(enabled=config.LOG_CAPTURE_PAYLOADS, sample_rate=config.LOG_CAPTURE_SAMPLE_RATE,
+                           max_bytes=config.LOG_CAPTURE_MAX_BYTES, capacity=config.LOG_CAPTURE_BUFFER)
@@ -1,115 +1,489 @@
-import requests
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+import asyncio
 import logging
-import json
-from datetime import datetime, timedelta
+import time
 
-app = FastAPI()
+import cache
+import compression
+import conditional
+import config
+import dolar
+import fastjson
+import history
+import http_client
+import item_details
+import log_utils
+import meli
+import metrics
+import sellers
+import upstream
+import watchlist
+from fastjson import JSONResponse
+from log_utils import log_stage, timed_stage
+
+app = FastAPI(default_response_class=JSONResponse)
+# Compresión gzip/Brotli de las respuestas según Accept-Encoding (incluido el NDJSON en streaming)
+app.add_middleware(compression.CompressionMiddleware)
+
+# Scheduler de la watchlist (se crea en el startup)
+watchlist_scheduler = None
 
 logging.basicConfig(level=logging.INFO)
 
+
+# Tiempo de cada request en /metrics y desglose por etapa en el header Server-Timing (visible en devtools).
+# En las respuestas en streaming sólo figuran las etapas previas al primer byte.
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    token = log_utils.start_request_timings()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        timings = log_utils.finish_request_timings(token)
+    total_ms = (time.perf_counter() - start) * 1000
+    route = request.scope.get("route")
+    metrics.http_request_seconds.observe(total_ms / 1000, route=route.path if route else "other",
+                                         status=response.status_code)
+    response.headers["Server-Timing"] = log_utils.server_timing_header(timings, total_ms)
+    return response
+
+
+# Ciclo de vida del cliente HTTP compartido (pool keep-alive) y de las tareas de fondo
+@app.on_event("startup")
+async def startup():
+    await http_client.startup()
+    dolar.dollar_blue.start()
+    if config.HISTORY_ENABLED:
+        history.store.open()
+
+    global watchlist_scheduler
+    watchlist_scheduler = watchlist.WatchlistScheduler(
+        watchlist.load_entries(config.WATCHLIST_PATH), refresh=refresh_search,
+        budget_per_minute=config.WATCHLIST_BUDGET_PER_MINUTE, concurrency=config.WATCHLIST_CONCURRENCY)
+    watchlist_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    if watchlist_scheduler is not None:
+        await watchlist_scheduler.stop()
+    await dolar.dollar_blue.stop()
+    await http_client.shutdown()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    history.store.close()
+    cache.shared_store.close()
+
+
 # Manejar la solicitud de favicon para evitar el error 404
 @app.get("/favicon.ico")
 async def favicon():
     return JSONResponse(status_code=204)
 
-# Variables globales para almacenar el valor del dólar blue y la última actualización
-dollar_blue_value = None
-last_updated = None
+# Ruta para obtener el valor "venta" del dólar blue (se lee de memoria, sin I/O). El ETag identifica la
+# cotización (valor y fecha): con If-None-Match responde 304 hasta el próximo refresco.
+@app.get("/dolar/blue", response_class=JSONResponse)
+async def get_dollar_blue(request: Request):
+    service = dolar.dollar_blue
+    snapshot = service.snapshot()
+    if snapshot["dollar_blue_sale_value"] is None:
+        return JSONResponse({"error": "No se pudo obtener el valor del dólar blue"}, status_code=503)
+    headers = conditional.validators(conditional.version_etag(service.value, service.updated_at),
+                                     service.updated_at, service.interval - service.age)
+    if conditional.not_modified(request, headers["ETag"], service.updated_at):
+        return conditional.not_modified_response(headers)
+    return JSONResponse(snapshot, headers=headers)
 
-# URL de la API de DólarAPI para obtener el valor del dólar blue
-DOLLAR_API_URL = "https://dolarapi.com/v1/dolares/blue"
 
+# Fuerza una actualización inmediata de la cotización
+@app.post("/dolar/blue/refresh", response_class=JSONResponse)
+async def refresh_dollar_blue():
+    refreshed = await dolar.dollar_blue.refresh(force=True)
+    return {"refreshed": refreshed, **dolar.dollar_blue.snapshot()}
 
-# Función para obtener el valor "venta" del dólar blue desde la API de DólarAPI
-def fetch_dollar_blue():
-    global dollar_blue_value, last_updated
 
-    # Actualizar solo si ha pasado más de 1 hora desde la última actualización
-    if last_updated is None or datetime.now() - last_updated > timedelta(hours=1):
-        try:
-            response = requests.get(DOLLAR_API_URL)
-            data = response.json()
+# Caché de resultados de búsqueda (TTL + LRU + stale-while-revalidate)
+search_cache = cache.make_cache("search", maxsize=config.SEARCH_CACHE_SIZE, ttl=config.SEARCH_CACHE_TTL,
+                                stale_ttl=config.SEARCH_CACHE_STALE_TTL, fallback_ttl=config.SEARCH_CACHE_FALLBACK_TTL)
+# Búsquedas idénticas concurrentes comparten una sola llamada a MercadoLibre
+search_flight = cache.SingleFlight()
 
-            # Asignamos el valor de venta del dólar blue
-            dollar_blue_value = data['venta']
-            last_updated = datetime.now()
-            logging.info(f"Dólar Blue actualizado: {dollar_blue_value}")
 
-        except Exception as e:
-            logging.error(f"Error al obtener el valor del dólar blue: {e}")
-            dollar_blue_value = None
+# Tareas de fondo lanzadas desde los requests (se guarda la referencia para que no las recolecte el GC)
+background_tasks = set()
 
-    return dollar_blue_value
 
+def run_in_background(coroutine):
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
-# Ruta para obtener el valor "venta" del dólar blue
-@app.get("/dolar/blue", response_class=JSONResponse)
-async def get_dollar_blue():
-    dollar_value = fetch_dollar_blue()
-    if dollar_value:
-        return {"dollar_blue_sale_value": dollar_value}
-    else:
-        return JSONResponse({"error": "No se pudo obtener el valor del dólar blue"}, status_code=500)
 
-@app.get("/scrape", response_class=JSONResponse)
-async def scrape(producto: str, estado: str = None, ano: int = None, precio_min: float = None, precio_max: float = None, envio_gratis: bool = False):
-    url = f"https://api.mercadolibre.com/sites/MLA/search?q={producto}"
+# Guarda los resultados frescos de una búsqueda en el historial de precios, en un hilo aparte
+def record_history(params, products):
+    if config.HISTORY_ENABLED and products:
+        run_in_background(asyncio.to_thread(history.safe_ingest, params["q"], products, dolar.dollar_blue.value))
+
 
-    # Filtro por estado del producto
-    if estado:
-        if estado in ["new", "used", "not_specified"]:  # Verificamos que el estado sea válido
-            url += f"&condition={estado}"
-        else:
-            logging.warning(f"Estado no válido: {estado}")
+# Búsqueda contra MercadoLibre (sin caché); cada resultado nuevo se registra en el historial
+async def search_and_record(params, limit):
+    products, paging = await meli.search(params, limit)
+    record_history(params, products)
+    return products, paging
 
-    # Filtro por año (posiblemente en categorías específicas como autos)
-    if ano:
-        # Aquí el año es más complicado de aplicar, podrías buscar un atributo dentro del producto
-        url += f"&year={ano}"
 
-    # Filtros por precio mínimo y máximo
-    if precio_min is not None:
-        url += f"&price={precio_min}-"  # Precio mínimo
-    if precio_max is not None:
-        url += f"&price=-{precio_max}"  # Precio máximo
+# Variante de search_and_record que publica en la cola `pages` los productos nuevos de cada página apenas llega,
+# para el stream que la inició, y la cierra con None al terminar. Corre como llamada compartida de search_flight:
+# los requests iguales que llegan mientras tanto esperan su resultado, y sigue hasta el final aunque el cliente del
+# stream se desconecte, así el resultado queda en la caché para ellos.
+async def stream_and_record(params, limit, key, pages):
+    seen = set()
+    products = []
+    total = 0
+    page_count = 0
+    page_iter = meli.iter_search_pages(params, limit)
+    try:
+        async for page in page_iter:
+            if not page_count:
+                total = page.get("paging", {}).get("total", 0) or 0
+            page_count += 1
+            new = []
+            for product in page.get("results", []):
+                if len(products) + len(new) >= limit or product.get("id") in seen:
+                    continue
+                seen.add(product.get("id"))
+                new.append(product)
+            products.extend(new)
+            pages.put_nowait(new)
+    finally:
+        await page_iter.aclose()
+        pages.put_nowait(None)
+
+    # En la caché y el historial quedan los resultados del buscador tal como llegaron (sin el detalle)
+    value = products, {"total": total, "fetched": len(products), "pages": page_count}
+    await search_cache.aset(key, value)
+    record_history(params, products)
+    return value
 
-    # Filtro de envío gratis
-    if envio_gratis:
-        url += "&shipping_cost=free"
 
-    logging.info(f"Fetching data from URL: {url}")
+# Devuelve la entrada de caché de una búsqueda (el valor es (productos, paging)) cuando es posible, recién
+# cargada si no, junto con el estado (HIT/STALE/MISS/FALLBACK)
+async def cached_search(params, limit):
+    key = meli.search_key(params, limit)
+    entry, state = await search_cache.alookup(key)
 
-    # Realizamos la solicitud a la API de Mercado Libre
-    response = requests.get(url)
-    logging.info(f"Status code: {response.status_code}")
+    async def load():
+        return await search_flight.do(key, lambda: search_and_record(params, limit))
 
-    if response.status_code != 200:
-        logging.error(f"Error al obtener datos de MercadoLibre: {response.text}")
-        return JSONResponse({"error": "Error al obtener datos de MercadoLibre"}, status_code=500)
+    if state == cache.TTLCache.HIT:
+        return entry, state
+    if state == cache.TTLCache.STALE:
+        search_cache.refresh_in_background(key, load)
+        return entry, state
 
     try:
-        data = response.json()
+        value = await load()
+    except meli.MeliError as e:
+        # Con MercadoLibre caído (o el circuito abierto) se sirve el último resultado conocido, si hay
+        entry = await search_cache.afallback(key)
+        if entry is None:
+            raise
+        logging.warning(f"Sirviendo resultados vencidos ({entry.age:.0f}s) de {params['q']!r}: {e}")
+        return entry, cache.TTLCache.FALLBACK
+    return await search_cache.aset(key, value), state
 
-        logging.info(f"Estructura de los datos recibidos: {type(data)}")
-        logging.info(f"Ejemplo de datos recibidos: {json.dumps(data, indent=2, ensure_ascii=False)}")
 
-        products = data.get("results", [])
-        if not isinstance(products, list):
-            logging.error(f"'results' no es una lista: {type(products)}")
-            return JSONResponse({"error": "'results' no es una lista"}, status_code=500)
+# ETag (hash del cuerpo), Last-Modified y Cache-Control de una respuesta armada desde una entrada de la caché de
+# búsquedas; una entrada stale o de fallback se informa como ya vencida
+def search_validators(entry, state, body):
+    fresh_for = search_cache.ttl - entry.age if state in (cache.TTLCache.HIT, cache.TTLCache.MISS) else 0
+    return {"X-Cache": state, **conditional.validators(conditional.content_etag(body), entry.stored_at, fresh_for)}
 
-        for index, product in enumerate(products):
-            logging.info(f"Producto {index + 1}: {json.dumps(product, indent=2, ensure_ascii=False)}")
 
-        return JSONResponse({"results": products})
+# Refresca una búsqueda sin mirar la caché y deja el resultado cacheado (lo usa la watchlist)
+async def refresh_search(params, limit):
+    key = meli.search_key(params, limit)
+    value = await search_flight.do(key, lambda: search_and_record(params, limit))
+    await search_cache.aset(key, value)
+    return value
+
+
+# Estado del backend: circuit breaker, rate limit y contadores de cada upstream, cotización y caché.
+# Con un circuito abierto o a prueba (half-open) el estado es "degraded" pero responde 200: se siguen sirviendo datos cacheados.
+@app.get("/health", response_class=JSONResponse)
+async def health():
+    return {
+        "status": "degraded" if upstream.degraded() else "ok",
+        "upstreams": upstream.snapshot(),
+        "dolar_blue": dolar.dollar_blue.snapshot(),
+        "search_cache": {"entries": len(search_cache), "single_flight": search_flight.stats()},
+    }
+
+
+# Métricas en formato Prometheus: latencia por etapa y por ruta, códigos de los upstreams, caché, payloads
+@app.get("/metrics")
+async def get_metrics():
+    metrics.cache_entries.set(len(search_cache), cache="search")
+    metrics.cache_entries.set(len(sellers.directory), cache="sellers")
+    metrics.cache_entries.set(len(item_details.details), cache="items")
+    for host, state in upstream.snapshot().items():
+        metrics.circuit_open.set(int(state["circuit"]["state"] == upstream.CircuitBreaker.OPEN), host=host)
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# Estado de la caché de búsquedas y contadores del coalescing de requests
+@app.get("/cache/stats", response_class=JSONResponse)
+async def cache_stats():
+    return {"search_cache": {"entries": len(search_cache), "max_entries": search_cache.maxsize},
+            "single_flight": search_flight.stats()}
+
+
+# Búsqueda en MercadoLibre. fields= elige qué campos de cada ítem se devuelven: un perfil
+# ("compact", el default con lo que usa el dashboard, o "all") o rutas separadas por coma ("id,seller.nickname")
+@app.get("/scrape", response_class=JSONResponse)
+async def scrape(request: Request, producto: str, estado: str = None, ano: int = None, precio_min: float = None,
+                 precio_max: float = None, envio_gratis: bool = False, max_items: int = None, pages: int = None,
+                 fields: str = "compact", details: bool = False):
+    params = meli.build_search_params(producto, estado, ano, precio_min, precio_max, envio_gratis)
+    limit = meli.resolve_max_items(max_items, pages)
+    projection = meli.compile_fields(fields)
+
+    # Realizamos las solicitudes a la API de Mercado Libre sin bloquear el event loop
+    try:
+        entry, cache_state = await cached_search(params, limit)
+    except meli.MeliError as e:
+        logging.error(str(e))
+        return JSONResponse({"error": "Error al obtener datos de MercadoLibre"}, status_code=e.status_code)
+    products, paging = entry.value
+
+    if details:
+        products = await item_details.enrich(products)
+
+    try:
+        with timed_stage("scrape.response", q=params.get("q"), cache=cache_state, items=len(products)) as stage:
+            response = JSONResponse({"results": meli.project_items(products, projection), "paging": paging})
+            stage["bytes"] = len(response.body)
+            headers = search_validators(entry, cache_state, response.body)
+            if conditional.not_modified(request, headers["ETag"], entry.stored_at):
+                stage["not_modified"] = True
+                return conditional.not_modified_response(headers)
+        response.headers.update(headers)
+        return response
 
     except Exception as e:
         logging.error(f"Error procesando los datos: {str(e)}")
         return JSONResponse({"error": "Error procesando los datos"}, status_code=500)
 
 
+# Una búsqueda de /scrape/batch: los mismos filtros que /scrape
+class BatchQuery(BaseModel):
+    producto: str
+    estado: Optional[str] = None
+    ano: Optional[int] = None
+    precio_min: Optional[float] = None
+    precio_max: Optional[float] = None
+    envio_gratis: bool = False
+    max_items: Optional[int] = None
+    pages: Optional[int] = None
+
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery]
+    fields: str = "compact"
+    details: bool = False
+    stream: bool = False
+
+
+# Corre una búsqueda del lote; los errores quedan en el resultado de esa búsqueda y no cortan el resto
+async def run_batch_query(index, query, projection, semaphore, details=False):
+    params = meli.build_search_params(query.producto, query.estado, query.ano, query.precio_min, query.precio_max,
+                                      query.envio_gratis)
+    limit = meli.resolve_max_items(query.max_items, query.pages)
+    async with semaphore:
+        try:
+            entry, cache_state = await cached_search(params, limit)
+            products, paging = entry.value
+            if details:
+                products = await item_details.enrich(products)
+        except meli.MeliError as e:
+            logging.error(f"Error en la búsqueda {index} del lote ({params['q']!r}): {e}")
+            return {"index": index, "q": params["q"], "ok": False, "status_code": e.status_code,
+                    "error": "Error al obtener datos de MercadoLibre"}
+        except Exception as e:
+            logging.error(f"Error procesando la búsqueda {index} del lote ({params['q']!r}): {e}")
+            return {"index": index, "q": params["q"], "ok": False, "status_code": 500, "error": "Error procesando los datos"}
+    return {"index": index, "q": params["q"], "ok": True, "cache": cache_state, "paging": paging,
+            "results": meli.project_items(products, projection)}
+
+
+# Muchas búsquedas en un solo request, cada una con sus filtros. Corren en paralelo (hasta BATCH_CONCURRENCY a la
+# vez) sobre el mismo pool HTTP, caché y coalescing que /scrape. Devuelve un resultado por búsqueda, en el orden
+# pedido, con "ok" y el error si falló; con "stream": true responde NDJSON, una línea por búsqueda a medida que terminan.
+@app.post("/scrape/batch")
+async def scrape_batch(batch: BatchRequest):
+    if len(batch.queries) > config.BATCH_MAX_QUERIES:
+        return JSONResponse({"error": f"Se admiten hasta {config.BATCH_MAX_QUERIES} búsquedas por lote"},
+                            status_code=400)
+    projection = meli.compile_fields(batch.fields)
+    semaphore = asyncio.Semaphore(config.BATCH_CONCURRENCY)
+    start = time.perf_counter()
+    tasks = [asyncio.create_task(run_batch_query(index, query, projection, semaphore, batch.details))
+             for index, query in enumerate(batch.queries)]
+
+    def summary(results):
+        failed = sum(1 for result in results if not result["ok"])
+        fields = {"queries": len(results), "failed": failed, "ms": (time.perf_counter() - start) * 1000}
+        log_stage("scrape.batch", **fields)
+        return fields
+
+    if not batch.stream:
+        results = await asyncio.gather(*tasks)
+        return {"results": results, "summary": summary(results)}
+
+    async def lines():
+        results = []
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                results.append(result)
+                yield fastjson.dumps_line(result)
+        finally:
+            for task in tasks:
+                task.cancel()
+        summary(results)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+class SellersRequest(BaseModel):
+    ids: List[int]
+
+
+# Reputación, ubicación y ventas de los vendedores pedidos, desde el directorio cacheado (los que falten se
+# piden al multiget de usuarios en lotes). Los ids que no se pudieron resolver no aparecen en la respuesta.
+@app.post("/sellers", response_class=JSONResponse)
+async def get_sellers(request: SellersRequest):
+    if len(request.ids) > config.SELLER_MAX_IDS:
+        return JSONResponse({"error": f"Se admiten hasta {config.SELLER_MAX_IDS} vendedores por request"},
+                            status_code=400)
+    with timed_stage("sellers.resolve", ids=len(request.ids)) as fields:
+        directory = await sellers.resolve(request.ids)
+        fields["found"] = len(directory)
+    return {"sellers": {str(seller_id): summary for seller_id, summary in directory.items()}}
+
+
+# Variante NDJSON de /scrape: un ítem por línea, enviado a medida que llega cada página de MercadoLibre.
+# Como en /scrape, fields= recorta cada ítem ("compact" por defecto, "all" para el JSON completo).
+@app.get("/scrape/stream")
+async def scrape_stream(request: Request, producto: str, estado: str = None, ano: int = None,
+                        precio_min: float = None, precio_max: float = None, envio_gratis: bool = False,
+                        max_items: int = None, pages: int = None, fields: str = "compact", details: bool = False):
+    params = meli.build_search_params(producto, estado, ano, precio_min, precio_max, envio_gratis)
+    limit = meli.resolve_max_items(max_items, pages)
+    projection = meli.compile_fields(fields)
+    key = meli.search_key(params, limit)
+    entry, state = await search_cache.alookup(key)
+
+    # Serializa un bloque de productos, con el detalle de cada publicación si se pidió details=true
+    async def render(products):
+        if details:
+            products = await item_details.enrich(products)
+        return b"".join(fastjson.dumps_line(p) for p in meli.project_items(products, projection))
+
+    # Desde la caché el cuerpo se arma completo antes de responder, para mandar su ETag (y 304 si no cambió)
+    async def cached_response(entry, state):
+        products, _ = entry.value
+        chunks = [await render(products[start:start + meli.PAGE_SIZE])
+                  for start in range(0, len(products), meli.PAGE_SIZE)]
+        headers = search_validators(entry, state, b"".join(chunks))
+        if conditional.not_modified(request, headers["ETag"], entry.stored_at):
+            return conditional.not_modified_response(headers)
+        return StreamingResponse(iter(chunks), media_type="application/x-ndjson", headers=headers)
+
+    if entry is not None:
+        if state == cache.TTLCache.STALE:
+            search_cache.refresh_in_background(key, lambda: search_flight.do(key, lambda: search_and_record(params, limit)))
+        return await cached_response(entry, state)
+
+    # Búsquedas iguales concurrentes (streams o /scrape) comparten una sola llamada a MercadoLibre: el primer stream
+    # la transmite página por página y los demás esperan el resultado completo y lo sirven como desde la caché.
+    # La primera página se espera antes de empezar a responder para poder devolver un error HTTP normal.
+    pages = asyncio.Queue()
+    task, leader = search_flight.start(key, lambda: stream_and_record(params, limit, key, pages))
+    first = await pages.get() if leader else None
+    if first is None:
+        try:
+            value = await asyncio.shield(task)
+        except meli.MeliError as e:
+            logging.error(str(e))
+            # Como en /scrape, si MercadoLibre no responde se sirve el último resultado conocido
+            entry = await search_cache.afallback(key)
+            if entry is None:
+                return JSONResponse({"error": "Error al obtener datos de MercadoLibre"}, status_code=e.status_code)
+            return await cached_response(entry, cache.TTLCache.FALLBACK)
+        # stream_and_record ya la dejó en la caché; una carga compartida de /scrape la guarda recién al volver
+        entry, _ = await search_cache.alookup(key)
+        if entry is None:
+            entry = await search_cache.aset(key, value)
+        return await cached_response(entry, state)
+
+    async def lines():
+        yield await render(first)
+        while (new := await pages.get()) is not None:
+            chunk = await render(new)
+            if chunk:
+                yield chunk
+        products, paging = await asyncio.shield(task)
+        log_stage("scrape.stream", q=params.get("q"), cache=state, items=len(products), pages=paging["pages"])
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Cache": state})
+
+
+# Serie diaria de precios (ARS) de una búsqueda: mínimo, mediana y máximo por día
+@app.get("/history/query/{query}/daily", response_class=JSONResponse)
+async def history_query_daily(query: str, days: int = 30):
+    series = await asyncio.to_thread(history.store.daily_prices, "query", meli.normalize_query(query), days)
+    return {"query": meli.normalize_query(query), "days": days, "series": series}
+
+
+# Serie diaria de precios (ARS) de una publicación
+@app.get("/history/item/{item_id}/daily", response_class=JSONResponse)
+async def history_item_daily(item_id: str, days: int = 30):
+    series = await asyncio.to_thread(history.store.daily_prices, "item_id", item_id, days)
+    return {"item_id": item_id, "days": days, "series": series}
+
+
+# Serie diaria de precios (ARS) de las publicaciones de un vendedor
+@app.get("/history/seller/{seller_id}/daily", response_class=JSONResponse)
+async def history_seller_daily(seller_id: int, days: int = 30):
+    series = await asyncio.to_thread(history.store.daily_prices, "seller_id", seller_id, days)
+    return {"seller_id": seller_id, "days": days, "series": series}
+
+
+# Snapshots guardados de una publicación, del más nuevo al más viejo
+@app.get("/history/item/{item_id}", response_class=JSONResponse)
+async def history_item(item_id: str, limit: int = 500):
+    return {"item_id": item_id, "snapshots": await asyncio.to_thread(history.store.item_snapshots, item_id, limit)}
+
+
+# Estado de las búsquedas programadas de la watchlist y del presupuesto de requests
+@app.get("/watchlist", response_class=JSONResponse)
+async def get_watchlist():
+    if watchlist_scheduler is None:
+        return {"entries": []}
+    return watchlist_scheduler.status()
+
+
+# Payloads capturados (muestreados) para depuración; requiere LOG_CAPTURE_PAYLOADS=1
+@app.get("/debug/payloads", response_class=JSONResponse)
+async def debug_payloads(stage: str = None, limit: int = 20):
+    return {"enabled": log_utils.payloads.enabled, "entries": log_utils.payloads.entries(stage, limit)}
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
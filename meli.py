@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from functools import lru_cache
+
+import httpx
+
+import config
+import fastjson
+import http_client
+import log_utils
+import upstream
+from log_utils import measure_stage, timed_stage
+
+# URL del buscador de MercadoLibre Argentina
+SEARCH_URL = f"{config.MELI_API_URL}/sites/MLA/search"
+
+# La API de búsqueda devuelve como máximo 50 ítems por página
+PAGE_SIZE = 50
+
+
+class MeliError(Exception):
+    def __init__(self, message, status_code=500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# Campos que usa el dashboard (app.py); es la proyección por defecto de /scrape
+COMPACT_FIELDS = (
+    "id", "title", "domain_id", "price", "currency_id", "condition", "available_quantity", "sold_quantity",
+    "listing_type_id", "catalog_listing", "thumbnail", "permalink", "seller_custom_field",
+    "attributes.id", "attributes.value_name",
+    "shipping.free_shipping", "shipping.tags",
+    "seller.id", "seller.nickname", "seller.seller_reputation",
+)
+
+# Perfiles de proyección aceptados en el parámetro fields=
+FIELD_PROFILES = {"compact": COMPACT_FIELDS, "all": None}
+
+
+# Construye los parámetros de búsqueda de MercadoLibre a partir de los filtros de /scrape
+def build_search_params(producto, estado=None, ano=None, precio_min=None, precio_max=None, envio_gratis=False):
+    params = {"q": normalize_query(producto)}
+
+    # Filtro por estado del producto
+    if estado:
+        if estado in ["new", "used", "not_specified"]:  # Verificamos que el estado sea válido
+            params["condition"] = estado
+        else:
+            logging.warning(f"Estado no válido: {estado}")
+
+    # Filtro por año (posiblemente en categorías específicas como autos)
+    if ano:
+        # Aquí el año es más complicado de aplicar, podrías buscar un atributo dentro del producto
+        params["year"] = ano
+
+    # Filtro por rango de precio: MercadoLibre espera un único parámetro "min-max"
+    if precio_min is not None or precio_max is not None:
+        params["price"] = f"{precio_min if precio_min is not None else '*'}-{precio_max if precio_max is not None else '*'}"
+
+    # Filtro de envío gratis
+    if envio_gratis:
+        params["shipping_cost"] = "free"
+
+    return params
+
+
+# Normaliza el texto de búsqueda (mayúsculas y espacios no cambian los resultados de MercadoLibre)
+def normalize_query(producto):
+    return " ".join(producto.lower().split())
+
+
+# Clave de caché de una búsqueda: los parámetros ya normalizados más la cantidad de ítems pedida
+def search_key(params, max_items):
+    return tuple(sorted(params.items())) + (("max_items", max_items),)
+
+
+# Convierte el parámetro fields= (perfil o lista de rutas separadas por coma) en un árbol de proyección.
+# Ej.: "id,shipping.tags" -> {"id": None, "shipping": {"tags": None}}; None significa "todo el ítem".
+@lru_cache(maxsize=64)
+def compile_fields(fields="compact"):
+    if fields in FIELD_PROFILES:
+        paths = FIELD_PROFILES[fields]
+    else:
+        paths = [path.strip() for path in fields.split(",") if path.strip()]
+    if paths is None:
+        return None
+
+    tree = {}
+    for path in paths:
+        node = tree
+        parts = path.split(".")
+        for part in parts[:-1]:
+            child = node.get(part, {})
+            if child is None:  # Ya se pidió el campo completo
+                break
+            node = node.setdefault(part, child)
+        else:
+            node[parts[-1]] = None
+    return tree
+
+
+# Recorta un valor según el árbol de proyección; las listas (p. ej. attributes) se proyectan ítem por ítem
+def project(value, tree):
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(element, tree) for element in value]
+    if isinstance(value, dict):
+        return {key: project(value[key], subtree) for key, subtree in tree.items() if key in value}
+    return value
+
+
+def project_items(items, tree):
+    if tree is None:
+        return items
+    return [project(item, tree) for item in items]
+
+
+# Traduce los parámetros max_items / pages de /scrape a una cantidad de ítems a traer
+def resolve_max_items(max_items=None, pages=None):
+    if max_items is None and pages is not None:
+        max_items = pages * PAGE_SIZE
+    if max_items is None:
+        max_items = PAGE_SIZE
+    return max(1, min(max_items, config.MELI_MAX_RESULTS))
+
+
+# Trae una página de resultados (offset/limit) del buscador
+async def fetch_search_page(params, offset=0, limit=PAGE_SIZE):
+    page_params = {**params, "offset": offset, "limit": limit}
+
+    with timed_stage("meli.page", q=params.get("q"), offset=offset) as fields:
+        try:
+            response = await http_client.get(SEARCH_URL, params=page_params)
+        except upstream.CircuitOpenError as e:
+            raise MeliError(str(e), status_code=503) from e
+        except httpx.HTTPError as e:
+            raise MeliError(f"Error de conexión con MercadoLibre: {e!r}", status_code=502) from e
+        fields["status"] = response.status_code
+        fields["bytes"] = len(response.content)
+
+        if response.status_code != 200:
+            raise MeliError(f"Error al obtener datos de MercadoLibre: {response.text[:500]}")
+
+        try:
+            with measure_stage("meli.parse"):
+                data = fastjson.loads(response.content)
+        except ValueError as e:
+            raise MeliError(f"Respuesta inválida de MercadoLibre: {e}") from e
+
+        results = data.get("results", [])
+        if not isinstance(results, list):
+            raise MeliError(f"'results' no es una lista: {type(results)}")
+        fields["items"] = len(results)
+
+    log_utils.payloads.capture("meli.page", data)
+    return data
+
+
+# Une las páginas en una sola lista, descartando ítems repetidos por id
+def merge_results(pages, max_items):
+    seen = set()
+    merged = []
+    for page in pages:
+        for item in page.get("results", []):
+            item_id = item.get("id") if isinstance(item, dict) else None
+            if item_id is not None:
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+            merged.append(item)
+            if len(merged) >= max_items:
+                return merged
+    return merged
+
+
+# Offsets de las páginas restantes según paging.total de la primera página
+def plan_offsets(first, max_items):
+    total = first.get("paging", {}).get("total", 0) or 0
+    target = min(total, max_items)
+    return total, target, range(PAGE_SIZE, target, PAGE_SIZE)
+
+
+# Lee paging.total de la primera página y trae el resto de los offsets en paralelo
+async def search(params, max_items=PAGE_SIZE):
+    with timed_stage("meli.search", q=params.get("q"), max_items=max_items) as fields:
+        first = await fetch_search_page(params, 0, min(PAGE_SIZE, max_items))
+
+        total, target, offsets = plan_offsets(first, max_items)
+        semaphore = asyncio.Semaphore(config.MELI_PAGE_CONCURRENCY)
+
+        async def fetch(offset):
+            async with semaphore:
+                return await fetch_search_page(params, offset, min(PAGE_SIZE, target - offset))
+
+        pages = [first]
+        for offset, page in zip(offsets, await asyncio.gather(*(fetch(o) for o in offsets), return_exceptions=True)):
+            # Una página secundaria fallida no invalida el resto de la búsqueda
+            if isinstance(page, Exception):
+                logging.warning(f"No se pudo obtener la página con offset {offset}: {page}")
+                continue
+            pages.append(page)
+
+        results = merge_results(pages, max_items)
+        fields.update(total=total, pages=len(pages), failed_pages=len(offsets) + 1 - len(pages), items=len(results))
+    return results, {"total": total, "fetched": len(results), "pages": len(pages)}
+
+
+# Variante incremental de search: entrega cada página apenas llega (la primera siempre primero),
+# en orden de llegada y no de offset
+async def iter_search_pages(params, max_items=PAGE_SIZE):
+    first = await fetch_search_page(params, 0, min(PAGE_SIZE, max_items))
+    yield first
+
+    total, target, offsets = plan_offsets(first, max_items)
+    semaphore = asyncio.Semaphore(config.MELI_PAGE_CONCURRENCY)
+
+    async def fetch(offset):
+        async with semaphore:
+            return await fetch_search_page(params, offset, min(PAGE_SIZE, target - offset))
+
+    tasks = [asyncio.create_task(fetch(o)) for o in offsets]
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            try:
+                page = await next_page
+            except MeliError as e:
+                logging.warning(f"No se pudo obtener una página de la búsqueda {params.get('q')!r}: {e}")
+                continue
+            yield page
+    finally:
+        # Si el consumidor corta el stream, no dejamos pedidos colgados
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,155 @@
+import bisect
+import threading
+
+# Métricas en memoria del proceso (contadores, gauges e histogramas con labels) expuestas en el formato
+# de texto de Prometheus desde /metrics. Es un registro mínimo para no sumar dependencias: cada proceso
+# (backend FastAPI y dashboard) expone las suyas.
+
+# Cortes de los histogramas de latencia (segundos) y de tamaño de payload (bytes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in (*zip(names, values), *extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return "+Inf" if value == float("inf") else repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[0][index] += 1
+            state[1] += 1
+            state[2] += value
+
+    def _render_value(self, key, state):
+        counts, count, total = state
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', '+Inf')])} {count}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        self._metrics.setdefault(metric.name, metric)
+        return self._metrics[metric.name]
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Content-Type del formato de texto de Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Métricas comunes: cada etapa medida con log_utils.timed_stage alimenta stage_seconds (y stage_payload_bytes
+# si informa "bytes"); los módulos suman sus contadores propios
+stage_seconds = registry.histogram("meli_stage_duration_seconds", "Duración de cada etapa del hot path",
+                                   ("stage",))
+stage_errors = registry.counter("meli_stage_errors_total", "Etapas que terminaron con una excepción",
+                                ("stage", "error"))
+stage_payload_bytes = registry.histogram("meli_stage_payload_bytes", "Tamaño de los payloads por etapa",
+                                         ("stage",), buckets=SIZE_BUCKETS)
+stage_last_payload_bytes = registry.gauge("meli_stage_last_payload_bytes", "Tamaño del último payload por etapa",
+                                          ("stage",))
+upstream_responses = registry.counter("meli_upstream_responses_total",
+                                      "Respuestas de las APIs externas por host y código (error/circuit_open "
+                                      "para fallas de conexión y llamadas cortadas por el circuit breaker)",
+                                      ("host", "status"))
+cache_requests = registry.counter("meli_cache_requests_total", "Consultas a las cachés por resultado",
+                                  ("cache", "result"))
+cache_shared_reads = registry.counter("meli_cache_shared_reads_total",
+                                      "Lecturas del nivel compartido (SQLite) de las cachés por resultado",
+                                      ("cache", "result"))
+compression_bytes = registry.counter("meli_compression_bytes_total",
+                                     "Bytes de las respuestas comprimidas antes (in) y después (out) de comprimir",
+                                     ("encoding", "direction"))
+http_request_seconds = registry.histogram("meli_http_request_duration_seconds", "Duración de los requests HTTP",
+                                          ("route", "status"))
+cache_entries = registry.gauge("meli_cache_entries", "Entradas guardadas en cada caché", ("cache",))
+circuit_open = registry.gauge("meli_upstream_circuit_open", "1 si el circuit breaker del host está abierto",
+                              ("host",))
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+
+import httpx
+
+import fastjson
+import http_client
+import upstream
+from log_utils import timed_stage
+
+# Multiget de MercadoLibre (/users?ids=..., /items?ids=...): un request devuelve una entrada {code, body} por id.
+# Lo usan el directorio de vendedores (sellers.py) y el detalle de publicaciones (item_details.py).
+
+
+# Un request al multiget `url` con los `ids` (y los `params` extra); devuelve {id: body} de las entradas que
+# MercadoLibre encontró. El tiempo, el tamaño y los encontrados quedan en el log bajo `stage`.
+async def fetch(url, ids, stage, **params):
+    with timed_stage(stage, ids=len(ids)) as fields:
+        response = await http_client.get(url, params={"ids": ",".join(str(i) for i in ids), **params})
+        fields["status"] = response.status_code
+        fields["bytes"] = len(response.content)
+        response.raise_for_status()
+
+        found = {}
+        for entry in fastjson.loads(response.content):
+            body = entry.get("body") if isinstance(entry, dict) else None
+            if isinstance(body, dict) and entry.get("code") == 200 and body.get("id") is not None:
+                found[body["id"]] = body
+        fields["found"] = len(found)
+    return found
+
+
+# Resuelve `ids` con `fetch_batch` (una corrutina que recibe una lista de ids y devuelve un dict) en lotes de
+# `size`, con hasta `concurrency` requests a la vez, y junta los resultados. Un lote que falla por HTTP, circuito
+# abierto o JSON inválido se omite con un warning (`label` describe los ids en el log); otros errores se propagan.
+async def fetch_all(ids, fetch_batch, size, concurrency, label):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_chunk(chunk):
+        async with semaphore:
+            return await fetch_batch(chunk)
+
+    chunks = [ids[start:start + size] for start in range(0, len(ids), size)]
+    fetched = {}
+    for chunk, result in zip(chunks, await asyncio.gather(*(fetch_chunk(c) for c in chunks), return_exceptions=True)):
+        if isinstance(result, (httpx.HTTPError, upstream.CircuitOpenError, ValueError)):
+            logging.warning(f"No se pudieron obtener {len(chunk)} {label}: {result!r}")
+            continue
+        if isinstance(result, BaseException):
+            raise result
+        fetched.update(result)
+    return fetched
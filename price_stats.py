@@ -0,0 +1,44 @@
+import numpy as np
+
+# Estadísticas de precios de una búsqueda calculadas en una sola pasada vectorizada con NumPy: cuartiles,
+# promedio, IQR, bigotes del box plot y conteos del histograma. Los gráficos se arman con estos resúmenes,
+# así que la figura que viaja al navegador crece con la cantidad de bins y no con la de publicaciones.
+
+# Bins del histograma de precios
+HISTOGRAM_BINS = 20
+
+# Máximo de valores atípicos que se dibujan como puntos en el box plot
+MAX_OUTLIERS = 500
+
+
+def compute(prices, bins=HISTOGRAM_BINS):
+    values = np.asarray(prices, dtype=float)
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return None
+
+    minimum, q1, median, q3, maximum = np.percentile(values, [0, 25, 50, 75, 100])
+    iqr = q3 - q1
+    low_limit = q1 - 1.5 * iqr
+    high_limit = q3 + 1.5 * iqr
+    inside = values[(values >= low_limit) & (values <= high_limit)]
+    outliers = values[(values < low_limit) | (values > high_limit)]
+    counts, edges = np.histogram(values, bins=bins)
+
+    return {
+        "count": int(values.size),
+        "min": float(minimum),
+        "max": float(maximum),
+        "mean": float(values.mean()),
+        "median": float(median),
+        "q1": float(q1),
+        "q3": float(q3),
+        "iqr": float(iqr),
+        # Bigotes: el valor más extremo dentro de 1.5 IQR de cada cuartil
+        "lower_fence": float(inside.min()) if inside.size else float(minimum),
+        "upper_fence": float(inside.max()) if inside.size else float(maximum),
+        "outliers": np.sort(outliers)[:MAX_OUTLIERS].tolist(),
+        "outlier_count": int(outliers.size),
+        "hist_counts": counts.tolist(),
+        "hist_edges": edges.tolist(),
+    }
@@ -0,0 +1,35 @@
+import asyncio
+import time
+
+
+# Token bucket: `rate` tokens por segundo hasta un máximo de `capacity`. acquire() espera hasta que
+# haya tokens suficientes, así que las llamadas se reparten en el tiempo en lugar de salir en ráfaga.
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.waited = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, tokens=1):
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self.tokens < tokens:
+                delay = (tokens - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self.tokens -= tokens
+
+    def stats(self):
+        self._refill()
+        return {"rate_per_second": self.rate, "capacity": self.capacity, "available": round(self.tokens, 2),
+                "waited_seconds": round(self.waited, 2)}
@@ -0,0 +1,56 @@
+import cache
+import config
+import multiget
+
+# Directorio de vendedores: reputación, ubicación y ventas de cada seller id, resueltos con el multiget
+# de usuarios de MercadoLibre (/users?ids=...) en lotes y guardados en una caché de TTL largo, de modo que
+# enriquecer una búsqueda cuesta unos pocos requests en lugar de uno por vendedor.
+
+USERS_URL = f"{config.MELI_API_URL}/users"
+
+directory = cache.make_cache("sellers", maxsize=config.SELLER_CACHE_SIZE, ttl=config.SELLER_CACHE_TTL)
+
+
+# Resumen de un usuario con los datos que muestra la tabla de vendedores
+def summarize(user):
+    reputation = user.get("seller_reputation") or {}
+    transactions = reputation.get("transactions") or {}
+    ratings = transactions.get("ratings") or {}
+    address = user.get("address") or {}
+    return {
+        "id": user.get("id"),
+        "nickname": user.get("nickname"),
+        "level_id": reputation.get("level_id"),
+        "power_seller_status": reputation.get("power_seller_status"),
+        "city": address.get("city"),
+        "state": address.get("state"),
+        "transactions_completed": transactions.get("completed"),
+        "transactions_total": transactions.get("total"),
+        "ratings_positive": ratings.get("positive"),
+        "permalink": user.get("permalink"),
+    }
+
+
+# Un request al multiget; devuelve {seller_id: resumen}. Los ids que MercadoLibre no encuentra se
+# devuelven con un resumen vacío (y se cachean igual, para no volver a pedirlos en cada búsqueda)
+async def fetch_users(ids):
+    found = await multiget.fetch(USERS_URL, ids, "meli.users")
+    users = {user_id: summarize(body) for user_id, body in found.items()}
+    for seller_id in ids:
+        users.setdefault(seller_id, summarize({"id": seller_id}))
+    return users
+
+
+# Resuelve los ids pedidos desde la caché y, los que falten, con el multiget en lotes concurrentes.
+# Si un lote falla se omite (esos vendedores quedan sin datos) y no se cachea.
+async def resolve(seller_ids):
+    found = await directory.aget_many(seller_ids)
+    missing = [seller_id for seller_id in dict.fromkeys(seller_ids) if seller_id not in found]
+    if not missing:
+        return found
+
+    fetched = await multiget.fetch_all(missing, fetch_users, config.SELLER_BATCH_SIZE, config.SELLER_CONCURRENCY,
+                                       "vendedores")
+    await directory.aset_many(fetched)
+    found.update(fetched)
+    return found
@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+
+from app import filter_frame
+
+# Expresiones tal como las arma la DataTable (filter_options case "sensitive" antepone "s", "insensitive" una "i")
+FRAME = pd.DataFrame({
+    "Marca": ["LG", "Samsung", "lg", "Philips"],
+    "Precio": ["$ 900.00", "$ 1,500.00", "$ 2,000.00", "US$ 10.00"],
+    "Precio en ARS": [900.0, 1500.0, 2000.0, 12000.0],
+    "Stock Disponible": [5, "No disponible", 1, 20],
+})
+
+
+@pytest.mark.parametrize("query, marcas", [
+    ("{Precio} s> 1000", ["Samsung", "lg", "Philips"]),
+    ("{Precio} s>= 1500", ["Samsung", "lg", "Philips"]),
+    ("{Precio} s< 1000", ["LG"]),
+    ("{Precio} s<= 1500", ["LG", "Samsung"]),
+    ("{Precio} s= 2000", ["lg"]),
+    ("{Precio} s!= 2000", ["LG", "Samsung", "Philips"]),
+    ("{Marca} s= LG", ["LG"]),
+    ("{Marca} i= LG", ["LG", "lg"]),
+    ("{Marca} seq LG", ["LG"]),
+    ("{Marca} ieq lg", ["LG", "lg"]),
+    ("{Marca} sne LG", ["Samsung", "lg", "Philips"]),
+    ("{Marca} scontains sa", []),
+    ("{Marca} icontains sa", ["Samsung"]),
+    ('{Marca} scontains "Sam"', ["Samsung"]),
+    ("{Stock Disponible} s> 4", ["LG", "Philips"]),
+    ("{Marca} icontains l && {Precio} s> 1000", ["lg", "Philips"]),
+])
+def test_filter_frame_dash_table_queries(query, marcas):
+    assert filter_frame(FRAME, query)["Marca"].tolist() == marcas
+
+
+def test_filter_frame_unsupported_expression_keeps_rows():
+    assert len(filter_frame(FRAME, "{Marca} is blank")) == len(FRAME)
@@ -0,0 +1,199 @@
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception_type, retry_if_result, stop_after_attempt, wait_random_exponential
+
+import config
+import metrics
+from ratelimit import TokenBucket
+
+# Política común para las llamadas a APIs externas (MercadoLibre, DólarAPI), por host:
+# token bucket para no superar la tasa permitida, reintentos con backoff exponencial con jitter
+# (respetando Retry-After) y un circuit breaker que corta rápido mientras el upstream está caído.
+
+# Respuestas que se reintentan y que cuentan como falla para el circuit breaker
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host, retry_in):
+        super().__init__(f"Circuito abierto para {host}: se reintenta en {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+# Circuit breaker: tras `threshold` fallas seguidas se abre y rechaza las llamadas durante `reset_timeout`
+# segundos; después deja pasar una sola llamada de prueba (half-open) que lo cierra o lo vuelve a abrir
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+        self._probing = False
+
+    def retry_in(self):
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self):
+        if self.state == self.OPEN and self.retry_in() == 0:
+            self.state = self.HALF_OPEN
+            self._probing = False
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+        return self.state == self.CLOSED
+
+    def release_probe(self):
+        self._probing = False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+    def snapshot(self):
+        return {"state": self.state, "consecutive_failures": self.failures, "times_opened": self.times_opened,
+                "retry_in": round(self.retry_in(), 1)}
+
+
+# Segundos pedidos por el upstream en Retry-After (en segundos o como fecha HTTP), o None
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_failure(response):
+    return response.status_code in RETRY_STATUSES
+
+
+class HostPolicy:
+    def __init__(self, host):
+        self.host = host
+        self.bucket = TokenBucket(rate=config.UPSTREAM_RATE_PER_SECOND, capacity=config.UPSTREAM_BURST)
+        self.breaker = CircuitBreaker(config.UPSTREAM_BREAKER_THRESHOLD, config.UPSTREAM_BREAKER_RESET)
+        self.counters = Counter()
+        self.statuses = Counter()
+        self.last_error = None
+        self._backoff = wait_random_exponential(multiplier=config.UPSTREAM_RETRY_BASE, max=config.UPSTREAM_RETRY_MAX_WAIT)
+
+    # Espera entre intentos: la que pide Retry-After si viene (acotada), si no backoff exponencial con jitter
+    def _wait(self, retry_state):
+        outcome = retry_state.outcome
+        response = None if outcome.failed else outcome.result()
+        delay = retry_after_seconds(response)
+        if delay is None:
+            delay = self._backoff(retry_state)
+        return min(delay, config.UPSTREAM_RETRY_MAX_WAIT)
+
+    async def _attempt(self, send):
+        if not self.breaker.allow():
+            self.counters["short_circuited"] += 1
+            metrics.upstream_responses.inc(host=self.host, status="circuit_open")
+            raise CircuitOpenError(self.host, self.breaker.retry_in())
+
+        try:
+            # La espera del token queda dentro del try: si se cancela ahí también hay que liberar la llamada de prueba
+            await self.bucket.acquire()
+            self.counters["attempts"] += 1
+            response = await send()
+        except httpx.TransportError as e:
+            self.counters["transport_errors"] += 1
+            metrics.upstream_responses.inc(host=self.host, status="error")
+            self.last_error = f"{type(e).__name__}: {e}"
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelación u otro error ajeno al upstream: no cuenta como falla, pero libera la llamada de prueba
+            self.breaker.release_probe()
+            raise
+
+        self.statuses[response.status_code] += 1
+        metrics.upstream_responses.inc(host=self.host, status=response.status_code)
+        if _is_failure(response):
+            self.last_error = f"HTTP {response.status_code}"
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    # Ejecuta `send` (una corrutina que hace el GET) con la política del host. Devuelve la última respuesta
+    # aunque sea un error HTTP; si sólo hubo errores de conexión, relanza el último
+    async def call(self, send):
+        self.counters["calls"] += 1
+        retrying = AsyncRetrying(
+            stop=stop_after_attempt(config.UPSTREAM_RETRY_ATTEMPTS),
+            wait=self._wait,
+            retry=retry_if_exception_type(httpx.TransportError) | retry_if_result(_is_failure),
+            before_sleep=self._before_sleep,
+            retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+            reraise=True,
+        )
+        return await retrying(self._attempt, send)
+
+    def _before_sleep(self, retry_state):
+        self.counters["retries"] += 1
+        logging.warning(f"Reintentando {self.host} (intento {retry_state.attempt_number}) en "
+                        f"{retry_state.next_action.sleep:.1f}s: {self.last_error}")
+
+    def snapshot(self):
+        return {"circuit": self.breaker.snapshot(), "rate_limit": self.bucket.stats(), "counters": dict(self.counters),
+                "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+                "last_error": self.last_error}
+
+
+_policies = {}
+
+
+def policy_for(url):
+    host = urlsplit(url).netloc
+    policy = _policies.get(host)
+    if policy is None:
+        policy = _policies[host] = HostPolicy(host)
+    return policy
+
+
+def snapshot():
+    return {host: policy.snapshot() for host, policy in _policies.items()}
+
+
+# True si algún upstream tiene el circuito abierto o a prueba (half-open)
+def degraded():
+    return any(policy.breaker.state in (CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN) for policy in _policies.values())
+
+
+def reset():
+    _policies.clear()
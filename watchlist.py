@@ -0,0 +1,156 @@
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import random
+import time
+from datetime import datetime, timezone
+
+import config
+import meli
+from log_utils import timed_stage
+from ratelimit import TokenBucket
+
+# Watchlist: búsquedas fijas que se refrescan solas cada cierto intervalo, para que el dashboard
+# encuentre siempre la caché caliente. El archivo (WATCHLIST_PATH) es una lista JSON de entradas con los
+# mismos filtros que acepta /scrape más su intervalo de refresco en segundos, por ejemplo:
+#   [{"producto": "iphone 15", "estado": "new", "max_items": 200, "interval": 900}]
+
+FILTERS = ("producto", "estado", "ano", "precio_min", "precio_max", "envio_gratis")
+
+
+class WatchEntry:
+    def __init__(self, producto, interval=None, max_items=None, pages=None, **filters):
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Filtros desconocidos en la watchlist: {sorted(unknown)}")
+        self.params = meli.build_search_params(producto, **filters)
+        self.max_items = meli.resolve_max_items(max_items, pages)
+        self.interval = max(float(interval or config.WATCHLIST_DEFAULT_INTERVAL), config.WATCHLIST_MIN_INTERVAL)
+        self.next_run = 0.0
+        self.last_run = None
+        self.last_items = None
+        self.last_error = None
+        self.runs = 0
+        self.task = None
+
+    # Páginas del buscador que consume un refresco (lo que se descuenta del presupuesto)
+    @property
+    def cost(self):
+        return math.ceil(self.max_items / meli.PAGE_SIZE)
+
+    def status(self):
+        return {
+            "params": self.params,
+            "max_items": self.max_items,
+            "interval": self.interval,
+            "runs": self.runs,
+            "last_run": None if self.last_run is None else datetime.fromtimestamp(self.last_run, timezone.utc).isoformat(),
+            "next_run_in": round(max(0.0, self.next_run - time.time()), 1),
+            "last_items": self.last_items,
+            "last_error": self.last_error,
+        }
+
+
+def load_entries(path):
+    if not path or not os.path.exists(path):
+        return []
+    # La watchlist es opcional: un archivo ilegible o mal formado se informa y no impide arrancar el backend
+    try:
+        with open(path, encoding="utf-8") as file:
+            raw_entries = json.load(file)
+    except (OSError, ValueError) as e:
+        logging.error(f"No se pudo leer la watchlist {path!r}: {e}")
+        return []
+    if not isinstance(raw_entries, list):
+        logging.error(f"La watchlist {path!r} debe ser una lista de búsquedas")
+        return []
+
+    entries = []
+    for raw in raw_entries:
+        if not isinstance(raw, dict):
+            logging.error(f"Entrada de watchlist inválida {raw!r}: debe ser un objeto")
+            continue
+        try:
+            entries.append(WatchEntry(**raw))
+        except (TypeError, ValueError) as e:
+            logging.error(f"Entrada de watchlist inválida {raw!r}: {e}")
+    return entries
+
+
+# Scheduler asyncio: reparte las primeras ejecuciones a lo largo de cada intervalo (para no disparar
+# todas juntas al arrancar) y descuenta cada refresco de un presupuesto global de requests por minuto
+# hacia api.mercadolibre.com. `refresh(params, max_items)` es quien busca y guarda en caché/historial.
+class WatchlistScheduler:
+    def __init__(self, entries, refresh, budget_per_minute, concurrency):
+        # Sin presupuesto el token bucket nunca se recarga: la watchlist queda desactivada
+        if budget_per_minute <= 0 and entries:
+            logging.error(f"WATCHLIST_BUDGET_PER_MINUTE debe ser mayor que 0 (es {budget_per_minute}); "
+                          f"la watchlist queda desactivada")
+            entries = []
+        budget_per_minute = max(1, budget_per_minute)
+        self.entries = entries
+        self.refresh = refresh
+        self.budget = TokenBucket(rate=budget_per_minute / 60, capacity=budget_per_minute)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._task = None
+        self._running = set()
+
+    def _schedule_initial(self):
+        now = time.time()
+        count = len(self.entries)
+        for index, entry in enumerate(self.entries):
+            entry.next_run = now + entry.interval * index / count + random.uniform(0, 1)
+
+    async def _run_entry(self, entry):
+        async with self._semaphore:
+            await self.budget.acquire(entry.cost)
+            with timed_stage("watchlist.refresh", q=entry.params["q"], max_items=entry.max_items) as fields:
+                try:
+                    products, _ = await self.refresh(entry.params, entry.max_items)
+                except Exception as e:
+                    entry.last_error = f"{type(e).__name__}: {e}"
+                    fields["error"] = type(e).__name__
+                    logging.error(f"Error al refrescar la watchlist {entry.params['q']!r}: {entry.last_error}")
+                else:
+                    entry.last_items = fields["items"] = len(products)
+                    entry.last_error = None
+            entry.runs += 1
+            entry.last_run = time.time()
+
+    async def _run(self):
+        self._schedule_initial()
+        queue = [(entry.next_run, index) for index, entry in enumerate(self.entries)]
+        heapq.heapify(queue)
+        while queue:
+            next_run, index = heapq.heappop(queue)
+            await asyncio.sleep(max(0.0, next_run - time.time()))
+
+            entry = self.entries[index]
+            # Si el refresco anterior sigue en curso (p. ej. esperando presupuesto) se saltea esta vuelta
+            if entry.task is None or entry.task.done():
+                entry.task = asyncio.create_task(self._run_entry(entry))
+                self._running.add(entry.task)
+                entry.task.add_done_callback(self._running.discard)
+
+            # Pequeño jitter para que entradas con el mismo intervalo no queden sincronizadas
+            entry.next_run = next_run + entry.interval * random.uniform(0.95, 1.05)
+            heapq.heappush(queue, (entry.next_run, index))
+
+    def start(self):
+        if self.entries and self._task is None:
+            logging.info(f"Watchlist: {len(self.entries)} búsquedas programadas")
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        tasks = [task for task in (self._task, *self._running) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    def status(self):
+        return {"entries": [entry.status() for entry in self.entries], "budget": self.budget.stats(),
+                "running": len(self._running)}